@@ -3,18 +3,28 @@
 
 import os
 import json
+import math
+import time
 import logging
 import datetime as dt
 import functools
 from typing import Dict, Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import azure.functions as func
 import requests
-from dateutil import tz
-from azure.storage.blob import BlobServiceClient
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from collections import defaultdict
 
 # ---------- Config ----------
+log = logging.getLogger(__name__)
+
 SS_API_BASE = "https://api.smartsheet.com/2.0"
 
 def safe_int_env(key: str, default: int = None) -> int:
@@ -76,39 +86,112 @@ IDENTITY_FOUNDATION_COLUMN_MAP : Dict[int, int] = {
 
 COLUMN_MAP: Dict[int, int] = {int(k): int(v) for k, v in IDENTITY_FOUNDATION_COLUMN_MAP.items()}
 
+# Snapshot the mapping as parallel tuples so the per-row loops don't rebuild
+# dict iteration state each time
+_SRC_COLS = tuple(COLUMN_MAP.keys())
+_DST_COLS = tuple(COLUMN_MAP.values())
+
+# Only these columns are ever read off a row – skip the rest at parse time
+SRC_WANTED = frozenset(COLUMN_MAP) | {
+    SRC_ROW_COL, SRC_ORDER_COL, SRC_FRONT_END_COL, SRC_TANK_COL,
+    SRC_NTP_DATE_COL, SRC_CONTRACT_DAYS_COL, SRC_NTP_COMPLETION_DATE_COL,
+    SRC_PROJECT_MANAGER_COL,
+}
+DEST_WANTED = frozenset(COLUMN_MAP.values()) | {
+    DEST_ROW_COL, DEST_TANK_COL, DEST_FRONT_END_COL, DEST_PROJECT_MANAGER_COL,
+}
+
 STATE_CONTAINER = os.environ.get("STATE_CONTAINER")
 STATE_BLOB      = os.environ.get("STATE_BLOB")
+# STATE_CONTAINER/STATE_BLOB are app-wide settings shared by every sync
+# function, and the siblings overwrite the shared blob with a bare
+# {"lastRun": ...} each tick. Our cursors (lastRun/lastFullSync) only mean
+# anything if they live in a blob nobody else touches.
+STATE_BLOB_FRONT_END = f"{STATE_BLOB}-front-end" if STATE_BLOB else STATE_BLOB
 BLOB_CS         = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
 
 DRY_RUN = os.getenv("DRY_RUN_FRONT_END", "false").lower() == "true"
+FULL_SYNC = os.getenv("FULL_SYNC_FRONT_END", "false").lower() == "true"
+FULL_SYNC_MAX_AGE_HOURS = 24  # force a full scan when the last one is older than this
 
+# Content-Type comes from requests itself via json=; only auth lives here
 HEADERS = {
     "Authorization": f"Bearer {SMARTSHEET_TOKEN}",
-    "Content-Type": "application/json"
 }
 
+# Shared session so every Smartsheet call reuses pooled TCP/TLS connections;
+# the Retry adapter also handles 429/5xx backoff for us
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        # No POST here: a replayed insert after a dropped 5xx response would
+        # duplicate rows; bulk_insert has its own per-batch fallback.
+        allowed_methods=["GET", "PUT"],
+    ),
+))
+
+PAGE_SIZE = 500
+FETCH_WORKERS = 8
+
 # ---------- Utilities ----------
 def to_iso_z(d: dt.datetime) -> str:
     if d.tzinfo is None:
-        d = d.replace(tzinfo=tz.UTC)
-    return d.astimezone(tz.UTC).isoformat().replace("+00:00", "Z")
+        d = d.replace(tzinfo=dt.timezone.utc)
+    return d.astimezone(dt.timezone.utc).isoformat().replace("+00:00", "Z")
+
+def parse_json(resp: requests.Response) -> Any:
+    # orjson decodes the raw bytes ~2-3x faster than resp.json(); fall back
+    # to stdlib if the wheel isn't available.
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return resp.json()
+
+def sval(cells: Dict[int, Any], col: int) -> str:
+    # Single lookup + strip; cells already map columnId to the raw value
+    v = cells.get(col)
+    return "" if v is None else str(v).strip()
+
+def tank_key(v):
+    # Tank #s are normally numeric – key the dest index on int so '42' and
+    # 42.0 (and stray whitespace) land on the same entry with a cheaper hash.
+    if v in (None, ""):
+        return None
+    if isinstance(v, (int, float)):
+        return int(v)
+    s = str(v).strip()
+    try:
+        return int(float(s))
+    except ValueError:
+        return s
 
 def chunked(seq, size):
     for i in range(0, len(seq), size):
         yield seq[i:i+size]
 
+@functools.lru_cache(maxsize=1)
 def blob_client():
+    # Built once per worker: parsing the connection string and probing
+    # create_container on every load/save was two wasted round trips per run.
+    # azure.storage.blob is imported here, not at module level – it is a
+    # heavy import and cold starts pay for it otherwise.
+    from azure.storage.blob import BlobServiceClient
     svc = BlobServiceClient.from_connection_string(BLOB_CS)
     container = svc.get_container_client(STATE_CONTAINER)
     try:
         container.create_container()
     except Exception:
         pass
-    return container.get_blob_client(STATE_BLOB)
+    return container.get_blob_client(STATE_BLOB_FRONT_END)
 
 def load_last_run() -> dt.datetime:
     bc = blob_client()
-    default = dt.datetime.utcnow().replace(tzinfo=tz.UTC) - dt.timedelta(days=1)
+    default = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=1)
     try:
         blob_data = bc.download_blob().readall().decode("utf-8")
         data = json.loads(blob_data)
@@ -119,27 +202,88 @@ def load_last_run() -> dt.datetime:
     except Exception:
         return default
 
-def save_last_run(ts: dt.datetime):
+def load_last_full_sync() -> dt.datetime:
+    """When the last reconciling full scan ran (same state blob).
+
+    lastRun is re-stamped on every tick, so the 24h staleness check has to
+    compare against this separately-persisted timestamp – against lastRun
+    it could only ever fire after prolonged downtime.
+    """
+    bc = blob_client()
+    default = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=2)
+    try:
+        data = json.loads(bc.download_blob().readall().decode("utf-8"))
+        ts_str = data.get("lastFullSync")
+        if not ts_str:
+            return default
+        return dt.datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
+    except Exception:
+        return default
+
+def save_last_run(ts: dt.datetime, last_full_sync: dt.datetime = None):
     bc = blob_client()
     payload = {"lastRun": to_iso_z(ts)}
+    if last_full_sync is not None:
+        payload["lastFullSync"] = to_iso_z(last_full_sync)
     bc.upload_blob(json.dumps(payload), overwrite=True)
 
 def ss_get(url: str, params: Dict[str, Any] = None) -> requests.Response:
-    logging.debug(f">>>>> SS_GET called with url={url} params={params}")
-
     if not SMARTSHEET_TOKEN:
         raise RuntimeError("SMARTSHEET_ACCESS_TOKEN is not set")
-    
-    logging.info(f"Smartsheet GET {url} params={params}")
-    
-    resp = requests.get(url, headers=HEADERS, params=params, timeout=60)
+
+    # %-style so the string is only built when the level is enabled
+    log.debug("Smartsheet GET %s params=%s", url, params)
+
+    resp = SESSION.get(url, params=params, timeout=60)
     # logging.info(f"Smartsheet GET {url} response: {resp.json()}")
 
     resp.raise_for_status()
     return resp
 
+def fetch_all_pages(sheet_id: int, modified_since: dt.datetime = None, column_ids=None):
+    """
+    Yield every row of a sheet, page by page: probe totalRowCount with a
+    pageSize=1 request, then pull all pages in parallel on the shared session.
+    Rows are yielded as each page lands so callers filter/index without ever
+    holding the whole raw sheet in memory. Pass modified_since to only get
+    rows changed since the last run.
+    """
+    url = f"{SS_API_BASE}/sheets/{sheet_id}"
+    extra: Dict[str, Any] = {}
+    if modified_since is not None:
+        extra["rowsModifiedSince"] = to_iso_z(modified_since)
+    if column_ids:
+        # Only transfer the columns we actually read – big payload cut on wide sheets
+        extra["columnIds"] = ",".join(str(c) for c in sorted(column_ids))
+
+    if modified_since is not None:
+        # totalRowCount ignores the rowsModifiedSince filter, so fanning out
+        # over the full-sheet page count would waste one GET per empty page.
+        # Incremental results are small – just page serially until short.
+        page = 1
+        while True:
+            r = ss_get(url, params={"include": "rowPermalink", "page": page, "pageSize": PAGE_SIZE, **extra})
+            batch = parse_json(r).get("rows", [])
+            yield from batch
+            if len(batch) < PAGE_SIZE:
+                break
+            page += 1
+        return
+
+    probe = ss_get(url, params={"pageSize": 1, **extra})
+    total = parse_json(probe).get("totalRowCount", 0)
+    pages = max(1, math.ceil(total / PAGE_SIZE))
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as ex:
+        futures = [
+            ex.submit(ss_get, url, {"include": "rowPermalink", "page": p, "pageSize": PAGE_SIZE, **extra})
+            for p in range(1, pages + 1)
+        ]
+        for fut in as_completed(futures):
+            yield from parse_json(fut.result()).get("rows", [])
+
 def ss_post(url: str, body: Any) -> requests.Response:
-    resp = requests.post(url, headers=HEADERS, data=json.dumps(body), timeout=60)
+    resp = SESSION.post(url, json=body, timeout=60)
     try:
         resp.raise_for_status()
     except requests.exceptions.HTTPError as e:
@@ -148,43 +292,53 @@ def ss_post(url: str, body: Any) -> requests.Response:
         # raise
         return resp  # <- if you want the caller to decide
 
-    logging.info(f"Smartsheet POST {url}, body: {body}, response: {resp.json()}")
+    # Don't re-parse/log the response body (or the batch) on the happy path –
+    # for 500-row batches that's MBs of JSON + string work per call.
+    log.info("Smartsheet POST %s status=%s", url, resp.status_code)
     return resp
-    # logging.info(f"Smartsheet POST {url}, body: {body}, response: {resp.json()}")
-    # resp.raise_for_status()
-    # return resp
 
 def ss_put(url: str, body: Any) -> requests.Response:
-    resp = requests.put(url, headers=HEADERS, data=json.dumps(body), timeout=60)
+    resp = SESSION.put(url, json=body, timeout=60)
     try:
         resp.raise_for_status()
     except requests.exceptions.HTTPError as e:
         logging.error(f"Smartsheet PUT {url} failed: {e}, response: {resp.text}")
         return resp  # still return so caller can inspect the response
 
-    logging.info(f"Smartsheet PUT {url}, response: {resp.json()}")
+    log.info("Smartsheet PUT %s status=%s", url, resp.status_code)
     return resp
-    # logging.info(f"Smartsheet PUT {url}, body: {body}") #, response: {resp.json()}")   
-    # resp.raise_for_status()
-    # return resp
 
-def cells_array_to_dict(cells: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+def cells_array_to_dict(cells: List[Dict[str, Any]], wanted: frozenset = None) -> Dict[int, Any]:
+    # Raw {columnId: value}; displayValue is never read downstream so we don't
+    # build a wrapper dict per cell. With `wanted`, unneeded columns are
+    # skipped at scan time.
     out = {}
     for c in cells or []:
         cid = int(c["columnId"])
-        out[cid] = {"value": c.get("value"), "displayValue": c.get("displayValue")}
+        if wanted is None or cid in wanted:
+            out[cid] = c.get("value")
     return out
 
-@functools.lru_cache(maxsize=2)
+# Column titles rarely change – keep them in a module-level TTL cache so warm
+# invocations skip the fetch but stale titles don't live forever.
+_TITLES_TTL_SECONDS = 300
+_TITLES_CACHE: Dict[int, Tuple[float, Dict[int, str]]] = {}
+
 def get_column_titles(sheet_id: int) -> Dict[int, str]:
     """
-    Return {columnId: title} using the correct endpoint:
-    GET /sheets/{sheetId}
+    Return {columnId: title} using the columns-only endpoint:
+    GET /sheets/{sheetId}/columns
     """
-    url = f"{SS_API_BASE}/sheets/{sheet_id}"
-    r = ss_get(url, params={"pageSize": 1})  # tiny page, we only need columns
-    data = r.json()
-    return {col["id"]: col["title"] for col in data.get("columns", [])}
+    now = time.time()
+    cached = _TITLES_CACHE.get(sheet_id)
+    if cached and (now - cached[0]) < _TITLES_TTL_SECONDS:
+        return cached[1]
+
+    url = f"{SS_API_BASE}/sheets/{sheet_id}/columns"
+    r = ss_get(url, params={"includeAll": "true"})
+    titles = {col["id"]: col["title"] for col in parse_json(r).get("data", [])}
+    _TITLES_CACHE[sheet_id] = (now, titles)
+    return titles
 
 def normalize(val):
     if val is None:
@@ -201,88 +355,67 @@ def log_source_row_changes(srow: Dict[str, Any], src_titles: Dict[int, str]):
     """
     scells = cells_array_to_dict(srow.get("cells", []))
     lines = []
-    for col_id, cell in scells.items():
-        val = cell.get("value")
+    for col_id, val in scells.items():
         if val not in (None, "", []):
             col_name = src_titles.get(col_id, str(col_id))
             lines.append(f"{col_name}: {val}")
     logging.info("[SOURCE ROW] " + " | ".join(lines))
 
 # ---------- Fetching ----------
-def list_all_source_project_rows() -> List[Dict[str, Any]]:
+def list_all_source_project_rows(modified_since: dt.datetime = None) -> List[Dict[str, Any]]:
     """
-    Fetch ALL rows from source with Row='Project' and Order='0000 - Project'
+    Fetch rows from source with Row='Project' and Order='0000 - Project'
     using the correct list endpoint: GET /sheets/{sheetId} with paging.
+    With modified_since set, only rows edited since then are fetched.
     """
-    logging.info(f"[SmartsheetSync] Getting all source rows from sheet {SOURCE_SHEET_ID}") 
+    logging.info(f"[SmartsheetSync] Fetching source rows from sheet {SOURCE_SHEET_ID} with Row='{ROW_VALUE_PROJECT}' and Order='{ORDER_VALUE_PROJECT}' (modifiedSince={modified_since})")
 
     rows: List[Dict[str, Any]] = []
-    page = 1
-    page_size = 500
-
-    logging.info(f"[SmartsheetSync] Fetching all source rows from sheet {SOURCE_SHEET_ID} with Row='{ROW_VALUE_PROJECT}' and Order='{ORDER_VALUE_PROJECT}'")
-
-    #while True:
-    url = f"{SS_API_BASE}/sheets/{SOURCE_SHEET_ID}"
-    params = {"include": "rowPermalink", "page": page, "pageSize": page_size}
-    
-    logging.info(f"fetching source ==>> {url}, params ==>> {params}")
-
-    r = ss_get(url, params=params)
-    data = r.json()
-    batch = data.get("rows", [])
-    logging.info(f">>>>> fetched {len(data)} from source")
-    # logging.info(f"<<<<< fetched rows: {batch}")
-
-    for row in batch:
-        scells = cells_array_to_dict(row.get("cells", []))
-        src_row_val   = str((scells.get(SRC_ROW_COL)   or {}).get("value") or "").strip()
-        src_order_val = str((scells.get(SRC_ORDER_COL) or {}).get("value") or "").strip()
-        src_front_end_val = str((scells.get(SRC_FRONT_END_COL) or {}).get("value") or "").strip()
+    for row in fetch_all_pages(SOURCE_SHEET_ID, modified_since=modified_since, column_ids=SRC_WANTED):
+        scells = cells_array_to_dict(row.get("cells", []), SRC_WANTED)
+        src_row_val   = sval(scells, SRC_ROW_COL)
+        src_order_val = sval(scells, SRC_ORDER_COL)
+        src_front_end_val = sval(scells, SRC_FRONT_END_COL)
         if src_row_val == ROW_VALUE_PROJECT and src_order_val == ORDER_VALUE_PROJECT: # and (src_front_end_val != ""):
+            row["_scells"] = scells  # stash the parsed cells so the planner doesn't re-parse
             rows.append(row)
-    # if len(batch) < page_size:
-    #     break
-    page += 1
     return rows
 
-def index_dest_by_tank_and_row() -> Dict[str, Dict[str, Any]]:
+def index_dest_by_tank_and_row() -> Dict[Any, List[Dict[str, Any]]]:
     """
     Index destination rows by Tank#, but keep ALL rows per tank in a list.
     We only include rows whose 'Row' column is 'Deep Foundation' so
     later filtering by DEST_ROW_COL is trivial or unnecessary.
     """
-    idx: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-    page = 1
-    page_size = 500
-    while True:
-        url = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}"
-        params = {"include": "rowPermalink", "page": page, "pageSize": page_size}
-        r = ss_get(url, params=params)
-        data = r.json()
-        batch = data.get("rows", [])
-        for row in batch:
-            cdict = cells_array_to_dict(row.get("cells", []))
-            row_val  = str((cdict.get(DEST_ROW_COL)  or {}).get("value") or "").strip()
-            tank_val =     (cdict.get(DEST_TANK_COL) or {}).get("value")
-            if row_val == ROW_VALUE_FRONT_END and tank_val not in (None, ""):
-                idx[str(tank_val).strip()].append(row)
-        if len(batch) < page_size:
-            break
-        page += 1
+    idx: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+    for row in fetch_all_pages(DEST_SHEET_ID, column_ids=DEST_WANTED):
+        cdict = cells_array_to_dict(row.get("cells", []), DEST_WANTED)
+        row_val  = sval(cdict, DEST_ROW_COL)
+        tank_val = cdict.get(DEST_TANK_COL)
+        key = tank_key(tank_val)
+        if row_val == ROW_VALUE_FRONT_END and key is not None:
+            row["_cells"] = cdict  # parsed once here, reused in the plan loop
+            idx[key].append(row)
     return dict(idx)
 
 # ---------- Diff / Planning ----------
 def find_column_diffs(
-    src_cells: Dict[int, Dict[str, Any]],
-    dest_cells: Dict[int, Dict[str, Any]],
-    src_titles: Dict[int, str],
-    dest_titles: Dict[int, str]
+    src_cells: Dict[int, Any],
+    dest_cells: Dict[int, Any],
+    src_titles: Dict[int, str] = None,
+    dest_titles: Dict[int, str] = None
 ) -> List[str]:
+    # Titles are purely presentational – only fetch them when the caller
+    # didn't pass any and a diff string is actually being built.
+    if src_titles is None:
+        src_titles = get_column_titles(SOURCE_SHEET_ID)
+    if dest_titles is None:
+        dest_titles = get_column_titles(DEST_SHEET_ID)
     diffs: List[str] = []
-    for src_col, dest_col in COLUMN_MAP.items():
-        src_val  = normalize((src_cells.get(src_col)  or {}).get("value"))
-        dest_val = normalize((dest_cells.get(dest_col) or {}).get("value"))
+    for i, src_col in enumerate(_SRC_COLS):
+        dest_col = _DST_COLS[i]
+        src_val  = normalize(src_cells.get(src_col))
+        dest_val = normalize(dest_cells.get(dest_col))
         if src_val != dest_val:
             diffs.append(f"{src_titles.get(src_col, str(src_col))}"
                          f"->{dest_titles.get(dest_col, str(dest_col))}: "
@@ -295,30 +428,28 @@ def build_operations(
     inserts: List[Dict[str, Any]] = []
     updates: List[Dict[str, Any]] = []
 
-    src_titles  = get_column_titles(SOURCE_SHEET_ID)
-    dest_titles = get_column_titles(DEST_SHEET_ID)
+    # Column titles only decorate log/diff strings – don't spend two
+    # Smartsheet GETs on them up front; find_column_diffs fetches lazily.
 
     for srow in source_rows:
-        scells = cells_array_to_dict(srow.get("cells", []))
+        scells = srow.get("_scells")
+        if scells is None:
+            scells = cells_array_to_dict(srow.get("cells", []), SRC_WANTED)
         # logging.info(f"[Plan] Source row: {scells}")
-        
-        src_row_val   = str((scells.get(SRC_ROW_COL)   or {}).get("value") or "").strip()
-        src_order_val = str((scells.get(SRC_ORDER_COL) or {}).get("value") or "").strip()
-        src_tank_val  =     (scells.get(SRC_TANK_COL)  or {}).get("value")
-        src_front_end_val = str((scells.get(SRC_FRONT_END_COL) or {}).get("value") or "").strip()
-        src_ntp_date_val = (scells.get(SRC_NTP_DATE_COL) or {}).get("value")
-        src_contract_days_val = (scells.get(SRC_CONTRACT_DAYS_COL) or {}).get("value")
-        src_ntp_completion_date_val = (scells.get(SRC_NTP_COMPLETION_DATE_COL) or {}).get("value")
-
-        # Must be a Project row
-        if src_row_val != ROW_VALUE_PROJECT or src_order_val != ORDER_VALUE_PROJECT:
-            continue
-        if src_tank_val in (None, ""):
-            continue
 
-        tank_key = str(src_tank_val).strip()
+        # Row/Order filtering already happened in list_all_source_project_rows –
+        # re-checking here just doubled the per-row string work.
+        src_tank_val  = scells.get(SRC_TANK_COL)
+        src_front_end_val = sval(scells, SRC_FRONT_END_COL)
+        src_ntp_date_val = scells.get(SRC_NTP_DATE_COL)
+        src_contract_days_val = scells.get(SRC_CONTRACT_DAYS_COL)
+        src_ntp_completion_date_val = scells.get(SRC_NTP_COMPLETION_DATE_COL)
 
-        candidates = dest_index.get(tank_key, [])
+        tkey = tank_key(src_tank_val)
+        if tkey is None:
+            continue
+
+        candidates = dest_index.get(tkey, [])
         if isinstance(candidates, dict):
             candidates = [candidates]
 
@@ -326,28 +457,30 @@ def build_operations(
 
         dest_row = None
         for row in candidates:
-            cdict = cells_array_to_dict(row.get("cells", []))
-            val = (cdict.get(DEST_ROW_COL) or {}).get("value")
-            if val == ROW_VALUE_FRONT_END:   # all indexed rows should already match
+            cdict = row.get("_cells")
+            if cdict is None:
+                cdict = cells_array_to_dict(row.get("cells", []), DEST_WANTED)
+            if cdict.get(DEST_ROW_COL) == ROW_VALUE_FRONT_END:   # all indexed rows should already match
                 dest_row = row
                 break
-        
-        logging.info(f"[Plan] Processing tank={tank_key}: dest_row found={dest_row is not None}")
-
-        dest_cells = cells_array_to_dict(dest_row.get("cells", [])) if dest_row else {}
-        
-        dest_front_end_val = dest_cells.get(DEST_FRONT_END_COL, {}).get('value')
-        
-        mapped_cells: List[Dict[str, Any]] = []
-        
+
+        log.debug("[Plan] Processing tank=%s: dest_row found=%s", tkey, dest_row is not None)
+
+        dest_cells = dest_row.get("_cells") if dest_row else {}
+        if dest_cells is None:
+            dest_cells = cells_array_to_dict(dest_row.get("cells", []), DEST_WANTED)
+
+        dest_front_end_val = dest_cells.get(DEST_FRONT_END_COL)
+
         if dest_row is None:
             # INSERT only if source "Front End - Site Work" is "Phoenix or Subcontractor"
             if src_front_end_val == "Phoenix" or src_front_end_val == "Subcontractor":
-                 # Build mapped cell payload        
-                for src_col, dest_col in COLUMN_MAP.items():
-                    if src_col in scells:
-                        mapped_cells.append({"columnId": dest_col, "value": scells[src_col].get("value")})
-                
+                 # Build mapped cell payload
+                mapped_cells = [
+                    {"columnId": _DST_COLS[i], "value": scells[sc]}
+                    for i, sc in enumerate(_SRC_COLS) if sc in scells
+                ]
+
                 mapped_cells.append({"columnId": 1618831289831300, "value": ROW_VALUE_FRONT_END}) # Primary column
                 mapped_cells.append({"columnId": 598484499255172, "value": "0002 - Front-End - Site Work"}) # Order
                 # Force Row column in destination to Deep Foundation"
@@ -355,87 +488,113 @@ def build_operations(
                 mapped_cells.append({"columnId": DEST_FRONT_END_COL, "value": src_front_end_val})      # Front End - Site Work column on 04 sheet with the value from 02 sheet
 
                 inserts.append({"toBottom": True, "cells": mapped_cells})
-                logging.info(f"[Plan] INSERT tank={tank_key} (Front End - Site Work = {src_front_end_val})")
+                log.info("[Plan] INSERT tank=%s (Front End - Site Work = %s)", tkey, src_front_end_val)
             else:
-                logging.info(f"[Plan] SKIP insert tank={tank_key} (Front End - Site Work = {src_front_end_val})")
+                log.debug("[Plan] SKIP insert tank=%s (Front End - Site Work = %s)", tkey, src_front_end_val)
         else:
             # UPDATE always if there are diffs
-            
-            dest_front_end_val = dest_cells.get(DEST_FRONT_END_COL, {}).get('value')
-            src_project_manager_val = str((scells.get(SRC_PROJECT_MANAGER_COL) or {}).get("value") or "").strip()
-            dest_project_manager_val = dest_cells.get(DEST_PROJECT_MANAGER_COL, {}).get('value')
+
+            src_project_manager_val = sval(scells, SRC_PROJECT_MANAGER_COL)
+            dest_project_manager_val = dest_cells.get(DEST_PROJECT_MANAGER_COL)
+
+            # Unchanged row – bail out before allocating any payload
+            if (src_front_end_val == dest_front_end_val
+                    and src_project_manager_val == dest_project_manager_val):
+                continue
+
+            mapped_cells: List[Dict[str, Any]] = []
 
             if(src_front_end_val != dest_front_end_val):
                 mapped_cells.append({"columnId": DEST_FRONT_END_COL, "value": src_front_end_val})      # update the Deep Foundation column on 04 sheet with the value from 02 sheet
-                logging.info(f"[Plan] UPDATE tank={tank_key} (Turning Front End from {dest_front_end_val} to {src_front_end_val})")
+                log.info("[Plan] UPDATE tank=%s (Turning Front End from %s to %s)", tkey, dest_front_end_val, src_front_end_val)
 
             # if(src_ntp_date_val != dest_cells.get(DEST_NTP_DATE_COL, {}).get("value")):
             #     mapped_cells.append({"columnId": DEST_NTP_DATE_COL, "value": src_ntp_date_val})      # update the NTP Date column on 04 sheet with the value from 02 sheet
             #     mapped_cells.append({"columnId": DEST_CONTRACT_DAYS_COL, "value": src_contract_days_val})      # update the Contract Days column on 04 sheet with the value from 02 sheet
             #     mapped_cells.append({"columnId": DEST_NTP_COMPLETION_DATE_COL, "value": src_ntp_completion_date_val})      # update the NTP Completion Date column on 04 sheet with the value from 02 sheet
-            #     logging.info(f"[Plan] UPDATE tank={tank_key} (NTP Date = {src_ntp_date_val})")
+            #     logging.info(f"[Plan] UPDATE tank={tkey} (NTP Date = {src_ntp_date_val})")
 
             if(src_project_manager_val != dest_project_manager_val):
                 mapped_cells.append({"columnId": DEST_PROJECT_MANAGER_COL, "value": src_project_manager_val}) # update the Project Manager column on 09 sheet with the value from 02 sheet
-                logging.info(f"[Plan] UPDATE tank={tank_key} (Project Manager = {src_project_manager_val})")
+                log.info("[Plan] UPDATE tank=%s (Project Manager = %s)", tkey, src_project_manager_val)
 
             if mapped_cells:
                 updates.append({"id": dest_row["id"], "cells": mapped_cells})
 
             # if diffs:
             #     updates.append({"id": dest_row["id"], "cells": mapped_cells})
-            #     logging.info(f"[Plan] UPDATE tank={tank_key} – diffs: {', '.join(diffs)}")
+            #     logging.info(f"[Plan] UPDATE tank={tkey} – diffs: {', '.join(diffs)}")
             # else:
-            #     logging.info(f"[Plan] SKIP update tank={tank_key} (no differences)")
+            #     logging.info(f"[Plan] SKIP update tank={tkey} (no differences)")
 
     return inserts, updates
 
 # ---------- Bulk Ops ----------
-def bulk_insert(rows: List[Dict[str, Any]]):
-    if not rows:
-        return
+WRITE_WORKERS = 6
+
+def _submit_one_batch(send, url: str, batch: List[Dict[str, Any]], op: str) -> bool:
+    """True only when the batch (or each individual retry) was confirmed."""
+    resp = send(url, batch)
+    if resp.status_code >= 400:
+        log.warning("[SmartsheetSync] Bulk %s failed for batch of %d rows – retrying individually.", op, len(batch))
+        ok = True
+        for row in batch:
+            r = send(url, [row])
+            if r.status_code >= 400:
+                log.error("[SmartsheetSync] Row %s failed: %s, response=%s", op, row, r.text)
+                ok = False
+        return ok
+    log.info("[SmartsheetSync] %s batch of %d rows OK", op, len(batch))
+    return True
+
+def _submit_batches(send, rows: List[Dict[str, Any]], op: str) -> bool:
+    # Batches against /sheets/{id}/rows are independent – submit them in
+    # parallel and let the session's Retry adapter absorb 429s.
     url = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}/rows"
-    for batch in chunked(rows, 500):
-        resp = ss_post(url, batch)
-        if resp.status_code >= 400:
-            logging.warning(f"[SmartsheetSync] Bulk insert failed for batch of {len(batch)} rows – retrying individually.")
-            for row in batch:
-                r = ss_post(url, [row])
-                if r.status_code >= 400:
-                    logging.error(f"[SmartsheetSync] Row insert failed: {row}, response={r.text}")
-        else:
-            logging.info(f"[SmartsheetSync] Inserted batch of {len(batch)} rows")
-def bulk_update(rows: List[Dict[str, Any]]):
+    batches = list(chunked(rows, 500))
+    ok = True
+    with ThreadPoolExecutor(max_workers=min(WRITE_WORKERS, len(batches))) as ex:
+        futures = [ex.submit(_submit_one_batch, send, url, batch, op) for batch in batches]
+        for fut in as_completed(futures):
+            ok = fut.result() and ok
+    return ok
+
+def bulk_insert(rows: List[Dict[str, Any]]) -> bool:
     if not rows:
-        return
-    url = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}/rows"
-    for batch in chunked(rows, 500):
-        resp = ss_put(url, batch)
-        if resp.status_code >= 400:
-            logging.warning(f"[SmartsheetSync] Bulk update failed for batch of {len(batch)} rows – retrying individually.")
-            for row in batch:
-                r = ss_put(url, [row])
-                if r.status_code >= 400:
-                    logging.error(f"[SmartsheetSync] Row update failed: {row}, response={r.text}")
-        else:
-            logging.info(f"[SmartsheetSync] Updated batch of {len(batch)} rows")
+        return True
+    return _submit_batches(ss_post, rows, "insert")
+
+def bulk_update(rows: List[Dict[str, Any]]) -> bool:
+    if not rows:
+        return True
+    return _submit_batches(ss_put, rows, "update")
 
 # ---------- Azure Function Entry ----------
 def main(mytimer: func.TimerRequest) -> None:
-    start_ts = dt.datetime.utcnow().replace(tzinfo=tz.UTC)
+    start_ts = dt.datetime.now(dt.timezone.utc)
     logging.info(f"=>[SmartsheetSync] Triggered at {to_iso_z(start_ts)}")
     logging.info(f"=>[SmartsheetSync] DRY_RUN mode is {'ON' if DRY_RUN else 'OFF'}")
 
-    #last_run = load_last_run()
-    #logging.info(f"[SmartsheetSync] Last run: {to_iso_z(last_run)}")
+    last_run = load_last_run()
+    last_full_sync = load_last_full_sync()
+    logging.info(f"[SmartsheetSync] Last run: {to_iso_z(last_run)}")
+
+    # Incremental fetch by default; fall back to a full scan periodically
+    # (or via FULL_SYNC_FRONT_END) so drift/deletes still get caught. The
+    # staleness check runs against lastFullSync – lastRun advances every
+    # tick and could never trip it.
+    modified_since = last_run
+    if FULL_SYNC or (start_ts - last_full_sync) > dt.timedelta(hours=FULL_SYNC_MAX_AGE_HOURS):
+        logging.info("[SmartsheetSync] Doing a full source scan.")
+        modified_since = None
+        last_full_sync = start_ts
 
     try:
-        # Always full scan for correctness; paging uses /sheets/{id}
-        source_rows = list_all_source_project_rows()
+        source_rows = list_all_source_project_rows(modified_since=modified_since)
         logging.info(f"[SmartsheetSync] Source candidate rows: {len(source_rows)}")
 
         if not source_rows:
-            save_last_run(start_ts)
+            save_last_run(start_ts, last_full_sync)
             logging.info("[SmartsheetSync] Nothing to do.")
             return
 
@@ -448,11 +607,16 @@ def main(mytimer: func.TimerRequest) -> None:
         if DRY_RUN:
             logging.warning("[SmartsheetSync] DRY_RUN mode ON – no changes will be written.")
         else:
-            bulk_insert(inserts)
-            bulk_update(updates) 
+            inserts_ok = bulk_insert(inserts)
+            updates_ok = bulk_update(updates)
+            if not (inserts_ok and updates_ok):
+                # Don't advance the rowsModifiedSince cursor past a failed
+                # write – the next tick must re-fetch and retry those rows.
+                logging.warning("[SmartsheetSync] Some writes failed – keeping previous sync state so the next tick retries.")
+                return
             logging.info("[SmartsheetSync] Changes committed to Smartsheet.")
 
-        save_last_run(start_ts)
+        save_last_run(start_ts, last_full_sync)
         logging.info("[SmartsheetSync] Done.")
     except Exception as ex:
         logging.exception(f"[identity-foundation-sync] FAILED: {ex}")
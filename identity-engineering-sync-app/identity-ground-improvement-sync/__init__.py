@@ -6,15 +6,30 @@ import json
 import logging
 import datetime as dt
 import functools
+from itertools import islice
+from dataclasses import dataclass
+from types import MappingProxyType
 from typing import Dict, Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import azure.functions as func
 import requests
+
+# orjson is ~3-5x faster for the multi-MB sheet payloads; fall back to the
+# stdlib when the wheel isn't installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dateutil import tz
 from azure.storage.blob import BlobServiceClient
-from collections import defaultdict
 
 # ---------- Config ----------
+log = logging.getLogger(__name__)
+
 SS_API_BASE = "https://api.smartsheet.com/2.0"
 
 def safe_int_env(key: str, default: int = None) -> int:
@@ -28,7 +43,6 @@ def safe_int_env(key: str, default: int = None) -> int:
     except Exception:
         raise RuntimeError(f"Invalid int for env var {key}: {val}")
 
-SMARTSHEET_TOKEN = os.environ.get("SMARTSHEET_ACCESS_TOKEN")
 SOURCE_SHEET_ID = 639499383033732   # hardcoded
 DEST_SHEET_ID   = 4814574961250180  # hardcoded
 
@@ -74,18 +88,60 @@ IDENTITY_FOUNDATION_COLUMN_MAP : Dict[int, int] = {
     1381617419112324: 7916833893732228,  # Bid #
 }
 
-COLUMN_MAP: Dict[int, int] = {int(k): int(v) for k, v in IDENTITY_FOUNDATION_COLUMN_MAP.items()}
-
-STATE_CONTAINER = os.environ.get("STATE_CONTAINER")
-STATE_BLOB      = os.environ.get("STATE_BLOB")
-BLOB_CS         = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
-
-DRY_RUN = os.getenv("DRY_RUN_GROUND_IMPROVEMENTS", "false").lower() == "true"
-
-HEADERS = {
-    "Authorization": f"Bearer {SMARTSHEET_TOKEN}",
-    "Content-Type": "application/json"
-}
+# Keys/values are already ints – no need to rebuild the dict at import;
+# the proxy just keeps anyone from mutating the shared map.
+COLUMN_MAP: Dict[int, int] = MappingProxyType(IDENTITY_FOUNDATION_COLUMN_MAP)
+_COLUMN_MAP_ITEMS = tuple(COLUMN_MAP.items())
+
+# columnIds filters for the sheet GETs – everything we read, nothing more
+_SRC_COLUMN_IDS = ",".join(str(c) for c in sorted(
+    set(COLUMN_MAP) | {SRC_ROW_COL, SRC_ORDER_COL, SRC_GROUND_IMPROVEMENTS_COL, SRC_TANK_COL,
+                       SRC_NTP_DATE_COL, SRC_CONTRACT_DAYS_COL, SRC_NTP_COMPLETION_DATE_COL,
+                       SRC_PROJECT_MANAGER_COL}))
+_DEST_COLUMN_IDS = ",".join(str(c) for c in sorted(
+    set(COLUMN_MAP.values()) | {DEST_ROW_COL, DEST_TANK_COL, DEST_GROUND_IMPROVEMENTS_COL,
+                                DEST_PROJECT_MANAGER_COL}))
+
+# Env-derived config is resolved on first use, not at import: Azure
+# Functions cold starts pay for module-level work, and a missing env var
+# should fail inside main() where it gets logged, not crash the worker.
+@dataclass(frozen=True)
+class Cfg:
+    smartsheet_token: str
+    state_container: str
+    state_blob: str
+    blob_cs: str
+    dry_run: bool
+
+@functools.lru_cache(maxsize=1)
+def cfg() -> Cfg:
+    return Cfg(
+        smartsheet_token=os.environ.get("SMARTSHEET_ACCESS_TOKEN"),
+        state_container=os.environ.get("STATE_CONTAINER"),
+        state_blob=os.environ.get("STATE_BLOB"),
+        blob_cs=os.environ.get("AZURE_STORAGE_CONNECTION_STRING"),
+        dry_run=os.getenv("DRY_RUN_GROUND_IMPROVEMENTS", "false").lower() == "true",
+    )
+
+# One pooled session for every Smartsheet call: keep-alive skips the TLS
+# handshake per request and the Retry adapter covers 429/5xx backoff.
+# PUTs are safe to replay (idempotent row updates); POSTs are not, so they
+# only retry on connection errors, never on a received 5xx.
+@functools.lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update({"Authorization": f"Bearer {cfg().smartsheet_token}"})
+    session.mount("https://", HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "PUT"],
+        ),
+    ))
+    return session
 
 # ---------- Utilities ----------
 def to_iso_z(d: dt.datetime) -> str:
@@ -93,18 +149,46 @@ def to_iso_z(d: dt.datetime) -> str:
         d = d.replace(tzinfo=tz.UTC)
     return d.astimezone(tz.UTC).isoformat().replace("+00:00", "Z")
 
+def dump_json(body: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(body)
+    return json.dumps(body).encode("utf-8")
+
+def parse_json(resp: requests.Response) -> Any:
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return resp.json()
+
+def sval(cells: Dict[int, Any], col: int) -> str:
+    # The str(cells.get(col) or "").strip() pattern, once
+    v = cells.get(col)
+    return "" if v is None else str(v).strip()
+
 def chunked(seq, size):
-    for i in range(0, len(seq), size):
-        yield seq[i:i+size]
+    # islice walks the source once instead of re-slicing a copy per chunk;
+    # each batch still comes out as a list for JSON serialization.
+    it = iter(seq)
+    while (chunk := list(islice(it, size))):
+        yield chunk
+
+# Built once per worker – load_last_run and save_last_run used to construct
+# a fresh BlobServiceClient (and probe create_container) on every call.
+_BLOB_CLIENT = None
+_CONTAINER_ENSURED = False
 
 def blob_client():
-    svc = BlobServiceClient.from_connection_string(BLOB_CS)
-    container = svc.get_container_client(STATE_CONTAINER)
-    try:
-        container.create_container()
-    except Exception:
-        pass
-    return container.get_blob_client(STATE_BLOB)
+    global _BLOB_CLIENT, _CONTAINER_ENSURED
+    if _BLOB_CLIENT is None:
+        svc = BlobServiceClient.from_connection_string(cfg().blob_cs)
+        container = svc.get_container_client(cfg().state_container)
+        if not _CONTAINER_ENSURED:
+            try:
+                container.create_container()
+            except Exception:
+                pass
+            _CONTAINER_ENSURED = True
+        _BLOB_CLIENT = container.get_blob_client(cfg().state_blob)
+    return _BLOB_CLIENT
 
 def load_last_run() -> dt.datetime:
     bc = blob_client()
@@ -127,19 +211,19 @@ def save_last_run(ts: dt.datetime):
 def ss_get(url: str, params: Dict[str, Any] = None) -> requests.Response:
     logging.debug(f">>>>> SS_GET called with url={url} params={params}")
 
-    if not SMARTSHEET_TOKEN:
+    if not cfg().smartsheet_token:
         raise RuntimeError("SMARTSHEET_ACCESS_TOKEN is not set")
     
     logging.info(f"Smartsheet GET {url} params={params}")
     
-    resp = requests.get(url, headers=HEADERS, params=params, timeout=60)
+    resp = get_session().get(url, params=params, timeout=60)
     # logging.info(f"Smartsheet GET {url} response: {resp.json()}")
 
     resp.raise_for_status()
     return resp
 
 def ss_post(url: str, body: Any) -> requests.Response:
-    resp = requests.post(url, headers=HEADERS, data=json.dumps(body), timeout=60)
+    resp = get_session().post(url, data=dump_json(body), headers={"Content-Type": "application/json"}, timeout=60)
     try:
         resp.raise_for_status()
     except requests.exceptions.HTTPError as e:
@@ -148,50 +232,58 @@ def ss_post(url: str, body: Any) -> requests.Response:
         # raise
         return resp  # <- if you want the caller to decide
 
-    logging.info(f"Smartsheet POST {url}, body: {body}, response: {resp.json()}")
+    # status + size only: re-parsing the body just to log it doubled the
+    # JSON work for every bulk batch
+    logging.info(f"Smartsheet POST {url} status={resp.status_code} bytes={len(resp.content)}")
     return resp
-    # logging.info(f"Smartsheet POST {url}, body: {body}, response: {resp.json()}")
-    # resp.raise_for_status()
-    # return resp
 
 def ss_put(url: str, body: Any) -> requests.Response:
-    resp = requests.put(url, headers=HEADERS, data=json.dumps(body), timeout=60)
+    resp = get_session().put(url, data=dump_json(body), headers={"Content-Type": "application/json"}, timeout=60)
     try:
         resp.raise_for_status()
     except requests.exceptions.HTTPError as e:
         logging.error(f"Smartsheet PUT {url} failed: {e}, response: {resp.text}")
         return resp  # still return so caller can inspect the response
 
-    logging.info(f"Smartsheet PUT {url}, response: {resp.json()}")
+    logging.info(f"Smartsheet PUT {url} status={resp.status_code} bytes={len(resp.content)}")
     return resp
-    # logging.info(f"Smartsheet PUT {url}, body: {body}") #, response: {resp.json()}")   
-    # resp.raise_for_status()
-    # return resp
-
-def cells_array_to_dict(cells: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
-    out = {}
-    for c in cells or []:
-        cid = int(c["columnId"])
-        out[cid] = {"value": c.get("value"), "displayValue": c.get("displayValue")}
-    return out
-
-@functools.lru_cache(maxsize=2)
+
+def cells_array_to_dict(cells: List[Dict[str, Any]]) -> Dict[int, Any]:
+    # Only `value` is ever consumed downstream – map columnId straight to it
+    # instead of allocating a {value, displayValue} wrapper per cell.
+    return {int(c["columnId"]): c.get("value") for c in cells or ()}
+
+# Column titles come along for free on page 1 of the row fetches, which
+# populate this cache; the dedicated GET below is only a fallback for the
+# odd path that needs titles before any sheet has been pulled.
+_TITLES_CACHE: Dict[int, Dict[int, str]] = {}
+
+def _cache_titles(sheet_id: int, data: Dict[str, Any]):
+    if sheet_id not in _TITLES_CACHE and data.get("columns"):
+        _TITLES_CACHE[sheet_id] = {col["id"]: col["title"] for col in data["columns"]}
+
 def get_column_titles(sheet_id: int) -> Dict[int, str]:
     """
-    Return {columnId: title} using the correct endpoint:
-    GET /sheets/{sheetId}
+    Return {columnId: title}, preferring the columns captured from an
+    earlier sheet fetch over a dedicated GET.
     """
-    url = f"{SS_API_BASE}/sheets/{sheet_id}"
-    r = ss_get(url, params={"pageSize": 1})  # tiny page, we only need columns
-    data = r.json()
-    return {col["id"]: col["title"] for col in data.get("columns", [])}
+    titles = _TITLES_CACHE.get(sheet_id)
+    if titles is None:
+        url = f"{SS_API_BASE}/sheets/{sheet_id}"
+        r = ss_get(url, params={"pageSize": 1})  # tiny page, we only need columns
+        _cache_titles(sheet_id, parse_json(r))
+        titles = _TITLES_CACHE.get(sheet_id, {})
+    return titles
 
 def normalize(val):
+    # Hot path ordered by frequency; `type() is` beats isinstance here and
+    # Smartsheet hands back exact types, never subclasses.
+    t = type(val)
+    if t is str:
+        return val.strip()
     if val is None:
         return ""
-    if isinstance(val, str):
-        return val.strip()
-    if isinstance(val, dt.datetime):
+    if t is dt.datetime:
         return to_iso_z(val)
     return str(val)
 
@@ -201,8 +293,7 @@ def log_source_row_changes(srow: Dict[str, Any], src_titles: Dict[int, str]):
     """
     scells = cells_array_to_dict(srow.get("cells", []))
     lines = []
-    for col_id, cell in scells.items():
-        val = cell.get("value")
+    for col_id, val in scells.items():
         if val not in (None, "", []):
             col_name = src_titles.get(col_id, str(col_id))
             lines.append(f"{col_name}: {val}")
@@ -214,63 +305,82 @@ def list_all_source_project_rows() -> List[Dict[str, Any]]:
     Fetch ALL rows from source with Row='Project' and Order='0000 - Project'
     using the correct list endpoint: GET /sheets/{sheetId} with paging.
     """
-    logging.info(f"[SmartsheetSync] Getting all source rows from sheet {SOURCE_SHEET_ID}") 
+    logging.info(f"[SmartsheetSync] Fetching all source rows from sheet {SOURCE_SHEET_ID} with Row='{ROW_VALUE_PROJECT}' and Order='{ORDER_VALUE_PROJECT}'")
 
     rows: List[Dict[str, Any]] = []
     page = 1
     page_size = 500
+    url = f"{SS_API_BASE}/sheets/{SOURCE_SHEET_ID}"
 
-    logging.info(f"[SmartsheetSync] Fetching all source rows from sheet {SOURCE_SHEET_ID} with Row='{ROW_VALUE_PROJECT}' and Order='{ORDER_VALUE_PROJECT}'")
+    while True:
+        # columnIds keeps the payload down to the columns we actually read;
+        # rowPermalink was never consumed downstream so don't ask for it.
+        params = {"columnIds": _SRC_COLUMN_IDS, "page": page, "pageSize": page_size}
+        r = ss_get(url, params=params)
+        data = parse_json(r)
+        _cache_titles(SOURCE_SHEET_ID, data)
+        batch = data.get("rows", [])
 
-    #while True:
-    url = f"{SS_API_BASE}/sheets/{SOURCE_SHEET_ID}"
-    params = {"include": "rowPermalink", "page": page, "pageSize": page_size}
-    
-    logging.info(f"fetching source ==>> {url}, params ==>> {params}")
-
-    r = ss_get(url, params=params)
-    data = r.json()
-    batch = data.get("rows", [])
-    logging.info(f">>>>> fetched {len(data)} from source")
-    # logging.info(f"<<<<< fetched rows: {batch}")
-
-    for row in batch:
-        scells = cells_array_to_dict(row.get("cells", []))
-        src_row_val   = str((scells.get(SRC_ROW_COL)   or {}).get("value") or "").strip()
-        src_order_val = str((scells.get(SRC_ORDER_COL) or {}).get("value") or "").strip()
-        src_ground_improvements_val = str((scells.get(SRC_GROUND_IMPROVEMENTS_COL) or {}).get("value") or "").strip()
-        if src_row_val == ROW_VALUE_PROJECT and src_order_val == ORDER_VALUE_PROJECT: # and (src_ground_improvements_val != ""):
-            rows.append(row)
-    # if len(batch) < page_size:
-    #     break
-    page += 1
+        for row in batch:
+            scells = cells_array_to_dict(row.get("cells", []))
+            src_row_val   = sval(scells, SRC_ROW_COL)
+            src_order_val = sval(scells, SRC_ORDER_COL)
+            src_ground_improvements_val = sval(scells, SRC_GROUND_IMPROVEMENTS_COL)
+            if src_row_val == ROW_VALUE_PROJECT and src_order_val == ORDER_VALUE_PROJECT: # and (src_ground_improvements_val != ""):
+                row["_cells"] = scells  # parsed once; build_operations reuses it
+                rows.append(row)
+        if len(batch) < page_size:
+            break
+        page += 1
     return rows
 
+# Warm-worker cache for the dest index, validated against the sheet's
+# version counter so a tick where nothing changed skips the full re-pull.
+_DEST_INDEX_VERSION = None
+_DEST_INDEX: Dict[str, Any] = None
+
 def index_dest_by_tank_and_row() -> Dict[str, Dict[str, Any]]:
     """
     Index destination rows by Tank#, but keep ALL rows per tank in a list.
     We only include rows whose 'Row' column is 'Ground Improvements' so
     later filtering by DEST_ROW_COL is trivial or unnecessary.
     """
-    idx: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    global _DEST_INDEX_VERSION, _DEST_INDEX
+
+    probe = ss_get(f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}", params={"pageSize": 1})
+    version = parse_json(probe).get("version")
+    if _DEST_INDEX is not None and version is not None and version == _DEST_INDEX_VERSION:
+        logging.info(f"[SmartsheetSync] Dest sheet version {version} unchanged – reusing cached index")
+        return _DEST_INDEX
+
+    idx: Dict[str, Dict[str, Any]] = {}
     page = 1
     page_size = 500
     while True:
         url = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}"
-        params = {"include": "rowPermalink", "page": page, "pageSize": page_size}
+        params = {"columnIds": _DEST_COLUMN_IDS, "page": page, "pageSize": page_size}
         r = ss_get(url, params=params)
-        data = r.json()
+        data = parse_json(r)
+        _cache_titles(DEST_SHEET_ID, data)
         batch = data.get("rows", [])
         for row in batch:
             cdict = cells_array_to_dict(row.get("cells", []))
-            row_val  = str((cdict.get(DEST_ROW_COL)  or {}).get("value") or "").strip()
-            tank_val =     (cdict.get(DEST_TANK_COL) or {}).get("value")
+            row_val  = sval(cdict, DEST_ROW_COL)
+            tank_val = cdict.get(DEST_TANK_COL)
             if row_val == ROW_VALUE_GROUND_IMPROVEMENTS and tank_val not in (None, ""):
-                idx[str(tank_val).strip()].append(row)
+                row["_cells"] = cdict  # parsed once; build_operations reuses it
+                key = str(tank_val).strip()
+                # One Ground Improvements row per tank is the invariant the
+                # planner relies on – first one wins, extras get flagged.
+                if idx.setdefault(key, row) is not row:
+                    logging.warning(f"[SmartsheetSync] Duplicate dest rows for tank {key}; keeping the first")
         if len(batch) < page_size:
             break
         page += 1
-    return dict(idx)
+
+    _DEST_INDEX_VERSION = version
+    _DEST_INDEX = idx
+    return _DEST_INDEX
 
 # ---------- Diff / Planning ----------
 def find_column_diffs(
@@ -280,9 +390,12 @@ def find_column_diffs(
     dest_titles: Dict[int, str]
 ) -> List[str]:
     diffs: List[str] = []
-    for src_col, dest_col in COLUMN_MAP.items():
-        src_val  = normalize((src_cells.get(src_col)  or {}).get("value"))
-        dest_val = normalize((dest_cells.get(dest_col) or {}).get("value"))
+    # Smartsheet omits empty cells from the array, so walking only the
+    # populated-and-mapped columns beats the full 16-entry map per row.
+    for src_col in src_cells.keys() & COLUMN_MAP.keys():
+        dest_col = COLUMN_MAP[src_col]
+        src_val  = normalize(src_cells.get(src_col))
+        dest_val = normalize(dest_cells.get(dest_col))
         if src_val != dest_val:
             diffs.append(f"{src_titles.get(src_col, str(src_col))}"
                          f"->{dest_titles.get(dest_col, str(dest_col))}: "
@@ -298,55 +411,47 @@ def build_operations(
     src_titles  = get_column_titles(SOURCE_SHEET_ID)
     dest_titles = get_column_titles(DEST_SHEET_ID)
 
+    # One level check up front; the per-row f-strings below only run when
+    # INFO is actually emitted.
+    log_info = log.isEnabledFor(logging.INFO)
+
     for srow in source_rows:
-        scells = cells_array_to_dict(srow.get("cells", []))
+        scells = srow.get("_cells")
+        if scells is None:
+            scells = cells_array_to_dict(srow.get("cells", []))
         # logging.info(f"[Plan] Source row: {scells}")
         
-        src_row_val   = str((scells.get(SRC_ROW_COL)   or {}).get("value") or "").strip()
-        src_order_val = str((scells.get(SRC_ORDER_COL) or {}).get("value") or "").strip()
-        src_tank_val  =     (scells.get(SRC_TANK_COL)  or {}).get("value")
-        src_ground_improvements_val = str((scells.get(SRC_GROUND_IMPROVEMENTS_COL) or {}).get("value") or "").strip()
-        src_ntp_date_val = (scells.get(SRC_NTP_DATE_COL) or {}).get("value")
-        src_contract_days_val = (scells.get(SRC_CONTRACT_DAYS_COL) or {}).get("value")
-        src_ntp_completion_date_val = (scells.get(SRC_NTP_COMPLETION_DATE_COL) or {}).get("value")
-
-        # Must be a Project row
-        if src_row_val != ROW_VALUE_PROJECT or src_order_val != ORDER_VALUE_PROJECT:
-            continue
+        src_tank_val  = scells.get(SRC_TANK_COL)
+        src_ground_improvements_val = sval(scells, SRC_GROUND_IMPROVEMENTS_COL)
+        src_ntp_date_val = scells.get(SRC_NTP_DATE_COL)
+        src_contract_days_val = scells.get(SRC_CONTRACT_DAYS_COL)
+        src_ntp_completion_date_val = scells.get(SRC_NTP_COMPLETION_DATE_COL)
+
+        # Row/Order were already filtered in list_all_source_project_rows
         if src_tank_val in (None, ""):
             continue
 
         tank_key = str(src_tank_val).strip()
 
-        candidates = dest_index.get(tank_key, [])
-        if isinstance(candidates, dict):
-            candidates = [candidates]
+        # The indexer keeps one pre-filtered row per tank, so no candidate
+        # scan or isinstance defensiveness is needed here.
+        dest_row = dest_index.get(tank_key)
 
-        # logging.info(f"[Plan] Candidates {candidates}")
+        if log_info:
+            log.info(f"[Plan] Processing tank={tank_key}: dest_row found={dest_row is not None}")
 
-        dest_row = None
-        for row in candidates:
-            cdict = cells_array_to_dict(row.get("cells", []))
-            val = (cdict.get(DEST_ROW_COL) or {}).get("value")
-            if val == ROW_VALUE_GROUND_IMPROVEMENTS:   # all indexed rows should already match
-                dest_row = row
-                break
+        dest_cells = (dest_row.get("_cells") or cells_array_to_dict(dest_row.get("cells", []))) if dest_row else {}
         
-        logging.info(f"[Plan] Processing tank={tank_key}: dest_row found={dest_row is not None}")
+        dest_ground_improvements_val = dest_cells.get(DEST_GROUND_IMPROVEMENTS_COL)
 
-        dest_cells = cells_array_to_dict(dest_row.get("cells", [])) if dest_row else {}
-        
-        dest_ground_improvements_val = dest_cells.get(DEST_GROUND_IMPROVEMENTS_COL, {}).get('value')
-        
-        mapped_cells: List[Dict[str, Any]] = []
-        
         if dest_row is None:
+            mapped_cells: List[Dict[str, Any]] = []
             # INSERT only if source "Ground Improvements" = "Required"
             if src_ground_improvements_val == "Required":
                  # Build mapped cell payload        
-                for src_col, dest_col in COLUMN_MAP.items():
+                for src_col, dest_col in _COLUMN_MAP_ITEMS:
                     if src_col in scells:
-                        mapped_cells.append({"columnId": dest_col, "value": scells[src_col].get("value")})
+                        mapped_cells.append({"columnId": dest_col, "value": scells[src_col]})
                 
                 mapped_cells.append({"columnId": 1618831289831300, "value": ROW_VALUE_GROUND_IMPROVEMENTS}) # Primary column
                 mapped_cells.append({"columnId": 598484499255172, "value": "0003 - Ground Improvements"}) # Order
@@ -355,19 +460,29 @@ def build_operations(
                 mapped_cells.append({"columnId": DEST_GROUND_IMPROVEMENTS_COL, "value": "Required"})      # Ground Improvements column on 04 sheet with the value from 02 sheet
 
                 inserts.append({"toBottom": True, "cells": mapped_cells})
-                logging.info(f"[Plan] INSERT tank={tank_key} (Ground Improvements = Required)")
+                if log_info:
+                    log.info(f"[Plan] INSERT tank={tank_key} (Ground Improvements = Required)")
             else:
-                logging.info(f"[Plan] SKIP insert tank={tank_key} (Ground Improvements = {src_ground_improvements_val})")
+                if log_info:
+                    log.info(f"[Plan] SKIP insert tank={tank_key} (Ground Improvements = {src_ground_improvements_val})")
         else:
             # UPDATE always if there are diffs
             
-            dest_ground_improvements_val = dest_cells.get(DEST_GROUND_IMPROVEMENTS_COL, {}).get('value')
-            src_project_manager_val = str((scells.get(SRC_PROJECT_MANAGER_COL) or {}).get("value") or "").strip()
-            dest_project_manager_val = dest_cells.get(DEST_PROJECT_MANAGER_COL, {}).get('value')
+            dest_ground_improvements_val = dest_cells.get(DEST_GROUND_IMPROVEMENTS_COL)
+            src_project_manager_val = sval(scells, SRC_PROJECT_MANAGER_COL)
+            dest_project_manager_val = dest_cells.get(DEST_PROJECT_MANAGER_COL)
+
+            # Nothing this row can change – skip before any payload work
+            if (src_ground_improvements_val == dest_ground_improvements_val
+                    and src_project_manager_val == dest_project_manager_val):
+                continue
+
+            mapped_cells = []
 
             if(src_ground_improvements_val != dest_ground_improvements_val):
                 mapped_cells.append({"columnId": 1052563474173828, "value": src_ground_improvements_val})      # update the ground improvements column on 04 sheet with the value from 02 sheet
-                logging.info(f"[Plan] UPDATE tank={tank_key} (Turning Ground Improvements from {dest_ground_improvements_val} to {src_ground_improvements_val})")
+                if log_info:
+                    log.info(f"[Plan] UPDATE tank={tank_key} (Turning Ground Improvements from {dest_ground_improvements_val} to {src_ground_improvements_val})")
 
             # if(src_ntp_date_val != dest_cells.get(DEST_NTP_DATE_COL, {}).get("value")):
             #     mapped_cells.append({"columnId": DEST_NTP_DATE_COL, "value": src_ntp_date_val})      # update the NTP Date column on 04 sheet with the value from 02 sheet
@@ -377,7 +492,8 @@ def build_operations(
 
             if(src_project_manager_val != dest_project_manager_val):
                 mapped_cells.append({"columnId": DEST_PROJECT_MANAGER_COL, "value": src_project_manager_val}) # update the Project Manager column on 09 sheet with the value from 02 sheet
-                logging.info(f"[Plan] UPDATE tank={tank_key} (Project Manager = {src_project_manager_val})")
+                if log_info:
+                    log.info(f"[Plan] UPDATE tank={tank_key} (Project Manager = {src_project_manager_val})")
 
             if mapped_cells:
                 updates.append({"id": dest_row["id"], "cells": mapped_cells})
@@ -391,47 +507,66 @@ def build_operations(
     return inserts, updates
 
 # ---------- Bulk Ops ----------
+# allowPartialSuccess lets good rows commit in one round trip and reports the
+# bad ones back with their index – no more 500x per-row retry amplification.
+BULK_ROWS_URL = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}/rows?allowPartialSuccess=true"
+
+def _log_failed_items(op: str, batch: List[Dict[str, Any]], resp: requests.Response):
+    try:
+        failed = parse_json(resp).get("failedItems") or []
+    except ValueError:
+        failed = []
+    for item in failed:
+        idx = item.get("index")
+        row = batch[idx] if isinstance(idx, int) and 0 <= idx < len(batch) else None
+        logging.error(f"[SmartsheetSync] Row {op} failed: {row}, error={item.get('error')}")
+    return len(failed)
+
+def _write_batches(send, rows: List[Dict[str, Any]], op: str):
+    # Batches are independent rows of the same sheet – run them concurrently
+    # on the pooled session; a handful of workers stays well under the
+    # Smartsheet rate limit and the Retry adapter soaks up any 429s.
+    batches = list(chunked(rows, 500))
+    with ThreadPoolExecutor(max_workers=min(4, len(batches))) as ex:
+        futures = {ex.submit(send, BULK_ROWS_URL, batch): batch for batch in batches}
+        for fut in as_completed(futures):
+            batch = futures[fut]
+            resp = fut.result()
+            if resp.status_code >= 400:
+                logging.error(f"[SmartsheetSync] Bulk {op} failed for batch of {len(batch)} rows: {resp.text[:200]}")
+            else:
+                failed = _log_failed_items(op, batch, resp)
+                logging.info(f"[SmartsheetSync] {op} batch of {len(batch)} rows done ({failed} failed)")
+
 def bulk_insert(rows: List[Dict[str, Any]]):
     if not rows:
         return
-    url = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}/rows"
-    for batch in chunked(rows, 500):
-        resp = ss_post(url, batch)
-        if resp.status_code >= 400:
-            logging.warning(f"[SmartsheetSync] Bulk insert failed for batch of {len(batch)} rows – retrying individually.")
-            for row in batch:
-                r = ss_post(url, [row])
-                if r.status_code >= 400:
-                    logging.error(f"[SmartsheetSync] Row insert failed: {row}, response={r.text}")
-        else:
-            logging.info(f"[SmartsheetSync] Inserted batch of {len(batch)} rows")
+    _write_batches(ss_post, rows, "insert")
+
 def bulk_update(rows: List[Dict[str, Any]]):
     if not rows:
         return
-    url = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}/rows"
-    for batch in chunked(rows, 500):
-        resp = ss_put(url, batch)
-        if resp.status_code >= 400:
-            logging.warning(f"[SmartsheetSync] Bulk update failed for batch of {len(batch)} rows – retrying individually.")
-            for row in batch:
-                r = ss_put(url, [row])
-                if r.status_code >= 400:
-                    logging.error(f"[SmartsheetSync] Row update failed: {row}, response={r.text}")
-        else:
-            logging.info(f"[SmartsheetSync] Updated batch of {len(batch)} rows")
+    _write_batches(ss_put, rows, "update")
 
 # ---------- Azure Function Entry ----------
 def main(mytimer: func.TimerRequest) -> None:
     start_ts = dt.datetime.utcnow().replace(tzinfo=tz.UTC)
     logging.info(f"=>[SmartsheetSync] Triggered at {to_iso_z(start_ts)}")
-    logging.info(f"=>[SmartsheetSync] DRY_RUN mode is {'ON' if DRY_RUN else 'OFF'}")
+    logging.info(f"=>[SmartsheetSync] DRY_RUN mode is {'ON' if cfg().dry_run else 'OFF'}")
 
     #last_run = load_last_run()
     #logging.info(f"[SmartsheetSync] Last run: {to_iso_z(last_run)}")
 
     try:
-        # Always full scan for correctness; paging uses /sheets/{id}
-        source_rows = list_all_source_project_rows()
+        # Always full scan for correctness; paging uses /sheets/{id}.
+        # Source and destination pulls don't depend on each other – run them
+        # in parallel so wall time is max() of the two, not the sum.
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            source_fut = ex.submit(list_all_source_project_rows)
+            dest_fut = ex.submit(index_dest_by_tank_and_row)
+            source_rows = source_fut.result()
+            dest_index = dest_fut.result()
+
         logging.info(f"[SmartsheetSync] Source candidate rows: {len(source_rows)}")
 
         if not source_rows:
@@ -439,17 +574,20 @@ def main(mytimer: func.TimerRequest) -> None:
             logging.info("[SmartsheetSync] Nothing to do.")
             return
 
-        dest_index = index_dest_by_tank_and_row()
         logging.info(f"[SmartsheetSync] Indexed destination rows (Row='Foundation'): {len(dest_index)}")
 
         inserts, updates = build_operations(source_rows, dest_index)
         logging.info(f"[SmartsheetSync] Plan => inserts: {len(inserts)} | updates: {len(updates)}")
 
-        if DRY_RUN:
+        if cfg().dry_run:
             logging.warning("[SmartsheetSync] DRY_RUN mode ON – no changes will be written.")
         else:
-            bulk_insert(inserts)
-            bulk_update(updates) 
+            # Inserts and updates touch disjoint rows – issue them in parallel
+            with ThreadPoolExecutor(max_workers=2) as ex:
+                ins_fut = ex.submit(bulk_insert, inserts)
+                upd_fut = ex.submit(bulk_update, updates)
+                ins_fut.result()
+                upd_fut.result()
             logging.info("[SmartsheetSync] Changes committed to Smartsheet.")
 
         save_last_run(start_ts)
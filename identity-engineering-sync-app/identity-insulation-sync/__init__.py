@@ -3,16 +3,29 @@
 
 import os
 import json
+import hashlib
 import logging
 import datetime as dt
-import functools
 from typing import Dict, Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
 import azure.functions as func
 import requests
+
+try:
+    import orjson  # 3-5x faster than stdlib json on sheet-sized payloads
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # stream-parse rows so a huge sheet never sits in RAM whole
+except ImportError:
+    ijson = None
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dateutil import tz
 from azure.storage.blob import BlobServiceClient
-from collections import defaultdict
 
 # ---------- Config ----------
 SS_API_BASE = "https://api.smartsheet.com/2.0"
@@ -79,36 +92,106 @@ SRC_DEST_COLUMN_MAP : Dict[int, int] = {
 }
 
 COLUMN_MAP: Dict[int, int] = {int(k): int(v) for k, v in SRC_DEST_COLUMN_MAP.items()}
+_COLUMN_MAP_ITEMS = tuple(COLUMN_MAP.items())  # stable snapshot for hot loops
+
+# Ask Smartsheet for just the columns we read (plus skip cells that don't
+# exist) – the payload shrinks by roughly the share of unmapped columns.
+_SRC_COLUMN_IDS = ",".join(str(c) for c in sorted(
+    set(COLUMN_MAP) | {SRC_ROW_COL, SRC_ORDER_COL, SRC_TANK_COL, SRC_INSULATION_COL,
+                       SRC_NTP_DATE_COL, SRC_CONTRACT_DAYS_COL, SRC_NTP_COMPLETION_DATE_COL,
+                       SRC_PROJECT_MANAGER_COL}))
 
 STATE_CONTAINER = os.environ.get("STATE_CONTAINER")
 STATE_BLOB      = os.environ.get("STATE_BLOB")
+# STATE_CONTAINER/STATE_BLOB are app-wide settings; the sibling syncs still
+# overwrite the shared blob with a bare {"lastRun": ...} each tick, which
+# would wipe lastFullSync and rowHashes and corrupt the incremental cursor.
+# Keep this function's state in its own blob.
+STATE_BLOB_INSULATION = f"{STATE_BLOB}-insulation" if STATE_BLOB else STATE_BLOB
 BLOB_CS         = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
 
 DRY_RUN = os.getenv("DRY_RUN_INSULATION", "false").lower() == "true"
+FULL_SYNC = os.getenv("FULL_SYNC_INSULATION", "false").lower() == "true"
+FULL_SYNC_MAX_AGE_HOURS = 24  # periodic full scan so deletes/drift get caught
 
 HEADERS = {
     "Authorization": f"Bearer {SMARTSHEET_TOKEN}",
     "Content-Type": "application/json"
 }
 
+# All Smartsheet traffic is network-bound; a single pooled session keeps the
+# TLS connection to api.smartsheet.com alive across every call instead of
+# re-handshaking per request. Retries stay off POST so inserts never replay.
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504],
+                      allowed_methods=["GET", "PUT"]),
+))
+
 # ---------- Utilities ----------
 def to_iso_z(d: dt.datetime) -> str:
     if d.tzinfo is None:
         d = d.replace(tzinfo=tz.UTC)
     return d.astimezone(tz.UTC).isoformat().replace("+00:00", "Z")
 
+def dump_json(body: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(body)
+    return json.dumps(body).encode("utf-8")
+
+def parse_json(resp: requests.Response) -> Any:
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return resp.json()
+
+def iter_rows(resp: requests.Response):
+    # With ijson, rows come off the socket one at a time instead of the
+    # whole sheet materializing before the filter runs.
+    if ijson is not None:
+        resp.raw.decode_content = True
+        # use_float: ijson otherwise hands back decimal.Decimal for JSON
+        # floats, which neither orjson nor stdlib json can serialize when
+        # the values get copied into insert/update payloads.
+        yield from ijson.items(resp.raw, "rows.item", use_float=True)
+    else:
+        yield from parse_json(resp).get("rows", [])
+
+# Fixed output slot per column of interest: pluck() fills a small list in
+# one pass over the raw cell array, no per-row dict needed.
+_SRC_FILTER_SLOTS = {SRC_ROW_COL: 0, SRC_ORDER_COL: 1}
+_SRC_TANK_SLOT = {SRC_TANK_COL: 0}
+
+def pluck(cells: List[Dict[str, Any]], slot_of: Dict[int, int], n: int) -> List[Any]:
+    out = [None] * n
+    for c in cells:
+        slot = slot_of.get(c["columnId"])
+        if slot is not None:
+            out[slot] = c.get("value")
+    return out
+
 def chunked(seq, size):
     for i in range(0, len(seq), size):
         yield seq[i:i+size]
 
+# One blob client per worker: load_last_run + save_last_run used to build a
+# fresh BlobServiceClient (TLS setup included) and re-attempt
+# create_container on every single call.
+_BLOB_CLIENT = None
+
 def blob_client():
-    svc = BlobServiceClient.from_connection_string(BLOB_CS)
-    container = svc.get_container_client(STATE_CONTAINER)
-    try:
-        container.create_container()
-    except Exception:
-        pass
-    return container.get_blob_client(STATE_BLOB)
+    global _BLOB_CLIENT
+    if _BLOB_CLIENT is None:
+        svc = BlobServiceClient.from_connection_string(BLOB_CS)
+        container = svc.get_container_client(STATE_CONTAINER)
+        try:
+            container.create_container()
+        except Exception:
+            pass
+        _BLOB_CLIENT = container.get_blob_client(STATE_BLOB_INSULATION)
+    return _BLOB_CLIENT
 
 def load_last_run() -> dt.datetime:
     bc = blob_client()
@@ -123,12 +206,51 @@ def load_last_run() -> dt.datetime:
     except Exception:
         return default
 
-def save_last_run(ts: dt.datetime):
+def load_row_hashes() -> Dict[str, str]:
+    """Per-tank signatures from the previous run (same state blob)."""
+    bc = blob_client()
+    try:
+        data = json.loads(bc.download_blob().readall().decode("utf-8"))
+        return data.get("rowHashes") or {}
+    except Exception:
+        return {}
+
+def load_last_full_sync() -> dt.datetime:
+    """When the last reconciling full scan ran (same state blob).
+
+    lastRun is re-stamped on every tick, so the staleness check has to run
+    against this separately-persisted timestamp or it would never fire on
+    a healthy 1-minute timer.
+    """
+    bc = blob_client()
+    default = dt.datetime.utcnow().replace(tzinfo=tz.UTC) - dt.timedelta(days=2)
+    try:
+        data = json.loads(bc.download_blob().readall().decode("utf-8"))
+        ts_str = data.get("lastFullSync")
+        if not ts_str:
+            return default
+        return dt.datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
+    except Exception:
+        return default
+
+def save_last_run(ts: dt.datetime, row_hashes: Dict[str, str] = None,
+                  last_full_sync: dt.datetime = None):
     bc = blob_client()
     payload = {"lastRun": to_iso_z(ts)}
+    if row_hashes:
+        payload["rowHashes"] = row_hashes
+    if last_full_sync is not None:
+        payload["lastFullSync"] = to_iso_z(last_full_sync)
     bc.upload_blob(json.dumps(payload), overwrite=True)
 
-def ss_get(url: str, params: Dict[str, Any] = None) -> requests.Response:
+# Columns that feed the per-tank signature – if none of these moved, the
+# whole plan step for that tank is a guaranteed no-op.
+_SIG_COLS = tuple(sorted(set(COLUMN_MAP) | {SRC_INSULATION_COL, SRC_PROJECT_MANAGER_COL}))
+
+def row_signature(scells: Dict[int, Any]) -> str:
+    return hashlib.sha1(repr([scells.get(c) for c in _SIG_COLS]).encode("utf-8")).hexdigest()[:16]
+
+def ss_get(url: str, params: Dict[str, Any] = None, stream: bool = False) -> requests.Response:
     logging.debug(f">>>>> SS_GET called with url={url} params={params}")
 
     if not SMARTSHEET_TOKEN:
@@ -136,14 +258,14 @@ def ss_get(url: str, params: Dict[str, Any] = None) -> requests.Response:
     
     logging.info(f"Smartsheet GET {url} params={params}")
     
-    resp = requests.get(url, headers=HEADERS, params=params, timeout=60)
+    resp = _SESSION.get(url, params=params, timeout=60, stream=stream)
     # logging.info(f"Smartsheet GET {url} response: {resp.json()}")
 
     resp.raise_for_status()
     return resp
 
 def ss_post(url: str, body: Any) -> requests.Response:
-    resp = requests.post(url, headers=HEADERS, data=json.dumps(body), timeout=60)
+    resp = _SESSION.post(url, data=dump_json(body), timeout=60)
     try:
         resp.raise_for_status()
     except requests.exceptions.HTTPError as e:
@@ -152,43 +274,46 @@ def ss_post(url: str, body: Any) -> requests.Response:
         # raise
         return resp  # <- if you want the caller to decide
 
-    logging.info(f"Smartsheet POST {url}, body: {body}, response: {resp.json()}")
+    # Lazy %-formatting and no body/response dump – the old line re-parsed
+    # the whole response JSON per batch just to log it.
+    logging.info("Smartsheet POST %s status=%s n=%s", url, resp.status_code,
+                 len(body) if isinstance(body, list) else 1)
     return resp
-    # logging.info(f"Smartsheet POST {url}, body: {body}, response: {resp.json()}")
-    # resp.raise_for_status()
-    # return resp
 
 def ss_put(url: str, body: Any) -> requests.Response:
-    resp = requests.put(url, headers=HEADERS, data=json.dumps(body), timeout=60)
+    resp = _SESSION.put(url, data=dump_json(body), timeout=60)
     try:
         resp.raise_for_status()
     except requests.exceptions.HTTPError as e:
         logging.error(f"Smartsheet PUT {url} failed: {e}, response: {resp.text}")
         return resp  # still return so caller can inspect the response
 
-    logging.info(f"Smartsheet PUT {url}, response: {resp.json()}")
+    logging.info("Smartsheet PUT %s status=%s n=%s", url, resp.status_code,
+                 len(body) if isinstance(body, list) else 1)
     return resp
-    # logging.info(f"Smartsheet PUT {url}, body: {body}") #, response: {resp.json()}")   
-    # resp.raise_for_status()
-    # return resp
-
-def cells_array_to_dict(cells: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
-    out = {}
-    for c in cells or []:
-        cid = int(c["columnId"])
-        out[cid] = {"value": c.get("value"), "displayValue": c.get("displayValue")}
-    return out
 
-@functools.lru_cache(maxsize=2)
+def cells_array_to_dict(cells: List[Dict[str, Any]]) -> Dict[int, Any]:
+    # displayValue was never read anywhere – map columnId straight to value
+    # and skip the quarter-million wrapper dicts a big sheet used to cost.
+    return {int(c["columnId"]): c.get("value") for c in cells or ()}
+
+# Explicit per-worker cache instead of lru_cache: no hashing/lock overhead
+# on lookups and the contents are visible for debugging.
+_TITLES_CACHE: Dict[int, Dict[int, str]] = {}
+
 def get_column_titles(sheet_id: int) -> Dict[int, str]:
     """
-    Return {columnId: title} using the correct endpoint:
-    GET /sheets/{sheetId}
+    Return {columnId: title} using the columns-only endpoint:
+    GET /sheets/{sheetId}/columns
     """
-    url = f"{SS_API_BASE}/sheets/{sheet_id}"
-    r = ss_get(url, params={"pageSize": 1})  # tiny page, we only need columns
-    data = r.json()
-    return {col["id"]: col["title"] for col in data.get("columns", [])}
+    titles = _TITLES_CACHE.get(sheet_id)
+    if titles is None:
+        # columns-only endpoint: no rows, no sheet metadata, tiny payload
+        url = f"{SS_API_BASE}/sheets/{sheet_id}/columns"
+        r = ss_get(url, params={"includeAll": "true"})
+        titles = {col["id"]: col["title"] for col in parse_json(r).get("data", [])}
+        _TITLES_CACHE[sheet_id] = titles
+    return titles
 
 def normalize(val):
     if val is None:
@@ -205,49 +330,46 @@ def log_source_row_changes(srow: Dict[str, Any], src_titles: Dict[int, str]):
     """
     scells = cells_array_to_dict(srow.get("cells", []))
     lines = []
-    for col_id, cell in scells.items():
-        val = cell.get("value")
+    for col_id, val in scells.items():
         if val not in (None, "", []):
             col_name = src_titles.get(col_id, str(col_id))
             lines.append(f"{col_name}: {val}")
     logging.info("[SOURCE ROW] " + " | ".join(lines))
 
 # ---------- Fetching ----------
-def list_all_source_project_rows() -> List[Dict[str, Any]]:
+def list_all_source_project_rows(modified_since: dt.datetime = None) -> List[Dict[str, Any]]:
     """
-    Fetch ALL rows from source with Row='Project' and Order='0000 - Project'
+    Fetch rows from source with Row='Project' and Order='0000 - Project'
     using the correct list endpoint: GET /sheets/{sheetId} with paging.
+    With modified_since set, Smartsheet only returns rows edited after it.
     """
-    logging.info(f"[SmartsheetSync] Getting all source rows from sheet {SOURCE_SHEET_ID}") 
+    logging.info(f"[SmartsheetSync] Fetching source rows from sheet {SOURCE_SHEET_ID} with Row='{ROW_VALUE_PROJECT}' and Order='{ORDER_VALUE_PROJECT}' (modifiedSince={modified_since})")
 
     rows: List[Dict[str, Any]] = []
     page = 1
-    page_size = 500
-
-    logging.info(f"[SmartsheetSync] Fetching all source rows from sheet {SOURCE_SHEET_ID} with Row='{ROW_VALUE_PROJECT}' and Order='{ORDER_VALUE_PROJECT}'")
-
-    #while True:
+    # Large pages cut the number of round trips; Smartsheet accepts well
+    # above the old 500.
+    page_size = 10000
     url = f"{SS_API_BASE}/sheets/{SOURCE_SHEET_ID}"
-    params = {"include": "rowPermalink", "page": page, "pageSize": page_size}
-    
-    logging.info(f"fetching source ==>> {url}, params ==>> {params}")
-
-    r = ss_get(url, params=params)
-    data = r.json()
-    batch = data.get("rows", [])
-    logging.info(f">>>>> fetched {len(data)} from source")
-    # logging.info(f"<<<<< fetched rows: {batch}")
-
-    for row in batch:
-        scells = cells_array_to_dict(row.get("cells", []))
-        src_row_val   = str((scells.get(SRC_ROW_COL)   or {}).get("value") or "").strip()
-        src_order_val = str((scells.get(SRC_ORDER_COL) or {}).get("value") or "").strip()
-        #src_shaft_val = str((scells.get(SRC_INSULATION_COL) or {}).get("value") or "").strip()
-        if src_row_val == ROW_VALUE_PROJECT and src_order_val == ORDER_VALUE_PROJECT: # and (src_shaft_val != ""):
-            rows.append(row)
-    # if len(batch) < page_size:
-    #     break
-    page += 1
+
+    while True:
+        params = {"columnIds": _SRC_COLUMN_IDS, "exclude": "nonexistentCells",
+                  "page": page, "pageSize": page_size}
+        if modified_since is not None:
+            params["rowsModifiedSince"] = to_iso_z(modified_since)
+        r = ss_get(url, params=params, stream=True)
+        batch_len = 0
+        for row in iter_rows(r):
+            batch_len += 1
+            # Filter on the raw cell list – only matching rows get dict-ified
+            row_v, order_v = pluck(row.get("cells", []), _SRC_FILTER_SLOTS, 2)
+            src_row_val   = str(row_v or "").strip()
+            src_order_val = str(order_v or "").strip()
+            if src_row_val == ROW_VALUE_PROJECT and src_order_val == ORDER_VALUE_PROJECT:
+                rows.append(row)
+        if batch_len < page_size:
+            break
+        page += 1
     return rows
 
 def index_dest_by_tank_and_row() -> Dict[str, Dict[str, Any]]:
@@ -256,25 +378,27 @@ def index_dest_by_tank_and_row() -> Dict[str, Dict[str, Any]]:
     We only include rows whose 'Row' column is 'Insulation' so
     later filtering by DEST_ROW_COL is trivial or unnecessary.
     """
-    idx: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    idx: Dict[str, Dict[str, Any]] = {}
     page = 1
     page_size = 500
     while True:
         url = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}"
         params = {"include": "rowPermalink", "page": page, "pageSize": page_size}
-        r = ss_get(url, params=params)
-        data = r.json()
-        batch = data.get("rows", [])
-        for row in batch:
+        r = ss_get(url, params=params, stream=True)
+        batch_len = 0
+        for row in iter_rows(r):
+            batch_len += 1
             cdict = cells_array_to_dict(row.get("cells", []))
-            row_val  = str((cdict.get(DEST_ROW_COL)  or {}).get("value") or "").strip()
-            tank_val =     (cdict.get(DEST_TANK_COL) or {}).get("value")
+            row_val  = str(cdict.get(DEST_ROW_COL) or "").strip()
+            tank_val =     cdict.get(DEST_TANK_COL)
             if row_val == ROW_VALUE_INSULATION and tank_val not in (None, ""):
-                idx[str(tank_val).strip()].append(row)
-        if len(batch) < page_size:
+                # The indexer is the only filter the planner needs – keep a
+                # single row per tank (first wins).
+                idx.setdefault(str(tank_val).strip(), row)
+        if batch_len < page_size:
             break
         page += 1
-    return dict(idx)
+    return idx
 
 # ---------- Diff / Planning ----------
 def find_column_diffs(
@@ -284,9 +408,13 @@ def find_column_diffs(
     dest_titles: Dict[int, str]
 ) -> List[str]:
     diffs: List[str] = []
-    for src_col, dest_col in COLUMN_MAP.items():
-        src_val  = normalize((src_cells.get(src_col)  or {}).get("value"))
-        dest_val = normalize((dest_cells.get(dest_col) or {}).get("value"))
+    # Locals shave a LOAD_GLOBAL per row x column off the tight loop
+    nrm = normalize
+    sc_get = src_cells.get
+    dc_get = dest_cells.get
+    for src_col, dest_col in _COLUMN_MAP_ITEMS:
+        src_val  = nrm(sc_get(src_col))
+        dest_val = nrm(dc_get(dest_col))
         if src_val != dest_val:
             diffs.append(f"{src_titles.get(src_col, str(src_col))}"
                          f"->{dest_titles.get(dest_col, str(dest_col))}: "
@@ -294,73 +422,75 @@ def find_column_diffs(
     return diffs
 def build_operations(
     source_rows: List[Dict[str, Any]],
-    dest_index: Dict[str, Dict[str, Any]]
-) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    dest_index: Dict[str, Dict[str, Any]],
+    old_hashes: Dict[str, str] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, str]]:
     inserts: List[Dict[str, Any]] = []
     updates: List[Dict[str, Any]] = []
+    old_hashes = old_hashes or {}
+    new_hashes: Dict[str, str] = dict(old_hashes)
 
-    src_titles  = get_column_titles(SOURCE_SHEET_ID)
-    dest_titles = get_column_titles(DEST_SHEET_ID)
+    # Two independent GETs on a cold cache – overlap them
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        src_fut = ex.submit(get_column_titles, SOURCE_SHEET_ID)
+        dest_fut = ex.submit(get_column_titles, DEST_SHEET_ID)
+        src_titles = src_fut.result()
+        dest_titles = dest_fut.result()
 
     for srow in source_rows:
-        scells = cells_array_to_dict(srow.get("cells", []))
-        # logging.info(f"[Plan] Source row: {scells}")
-        
-        src_row_val   = str((scells.get(SRC_ROW_COL)   or {}).get("value") or "").strip()
-        src_order_val = str((scells.get(SRC_ORDER_COL) or {}).get("value") or "").strip()
-        src_tank_val  =     (scells.get(SRC_TANK_COL)  or {}).get("value")
-        src_insulation_val = str((scells.get(SRC_INSULATION_COL) or {}).get("value") or "").strip()
-        src_ntp_date_val = (scells.get(SRC_NTP_DATE_COL) or {}).get("value")
-        src_contract_days_val = (scells.get(SRC_CONTRACT_DAYS_COL) or {}).get("value")
-        
-        logging.info(f"[Plan] Source row Tank={src_tank_val}, Shaft={src_insulation_val}, NTP Date={src_ntp_date_val}, Contract Days={src_contract_days_val}")
-
-        src_ntp_completion_date_val = (scells.get(SRC_NTP_COMPLETION_DATE_COL) or {}).get("value")
+        cells_list = srow.get("cells", [])
 
-
-        # Must be a Project row
-        if src_row_val != ROW_VALUE_PROJECT or src_order_val != ORDER_VALUE_PROJECT:
-            continue
+        # Rows were already Row/Order-filtered at fetch time; peek at the
+        # tank with a cheap slot scan and only dict-ify rows that can plan.
+        (src_tank_val,) = pluck(cells_list, _SRC_TANK_SLOT, 1)
         if src_tank_val in (None, ""):
             continue
 
+        scells = cells_array_to_dict(cells_list)
+        # logging.info(f"[Plan] Source row: {scells}")
+
+        src_insulation_val = str(scells.get(SRC_INSULATION_COL) or "").strip()
+        src_ntp_date_val = scells.get(SRC_NTP_DATE_COL)
+        src_contract_days_val = scells.get(SRC_CONTRACT_DAYS_COL)
+        src_ntp_completion_date_val = scells.get(SRC_NTP_COMPLETION_DATE_COL)
+
+        logging.info(f"[Plan] Source row Tank={src_tank_val}, Shaft={src_insulation_val}, NTP Date={src_ntp_date_val}, Contract Days={src_contract_days_val}")
+
         tank_key = str(src_tank_val).strip()
 
-        candidates = dest_index.get(tank_key, [])
-        if isinstance(candidates, dict):
-            candidates = [candidates]
+        # Every indexed row already passed the Insulation filter, so the
+        # old candidate-list walk was re-checking a guaranteed invariant.
+        dest_row = dest_index.get(tank_key)
 
-        # logging.info(f"[Plan] Candidates {candidates}")
+        # Unchanged since last run (per the stored signature)? Skip the
+        # whole diff/payload step. Only for existing dest rows – a missing
+        # dest row may still need an insert even with an unchanged source.
+        sig = row_signature(scells)
+        if dest_row is not None and old_hashes.get(tank_key) == sig:
+            continue
+        new_hashes[tank_key] = sig
 
-        dest_row = None
-        for row in candidates:
-            cdict = cells_array_to_dict(row.get("cells", []))
-            val = (cdict.get(DEST_ROW_COL) or {}).get("value")
-            if val == ROW_VALUE_INSULATION:   # all indexed rows should already match
-                dest_row = row
-                break
-        
         #logging.info(f"[Plan] Processing tank={tank_key}: dest_row found={dest_row is not None}")
 
         dest_cells = cells_array_to_dict(dest_row.get("cells", [])) if dest_row else {}
         
-        dest_insulation_val = dest_cells.get(DEST_INSULATION_COL, {}).get('value')
+        dest_insulation_val = dest_cells.get(DEST_INSULATION_COL)
         
         mapped_cells: List[Dict[str, Any]] = []
         
         if dest_row is None:
             # INSERT only if source "Insulation" is "Phoenix or Subcontractor"
             if src_insulation_val == "Phoenix" or src_insulation_val == "Subcontractor":
-                 # Build mapped cell payload        
-                for src_col, dest_col in COLUMN_MAP.items():
-                    if src_col in scells:
-                        mapped_cells.append({"columnId": dest_col, "value": scells[src_col].get("value")})
-                
-                mapped_cells.append({"columnId": DEST_PRIMERY_COL, "value": ROW_VALUE_INSULATION}) # Primary column
-                mapped_cells.append({"columnId": DEST_ORDER_COL, "value": DEST_ORDER_VAL}) # Order
-                # Force Row column in destination to Shaft"
-                mapped_cells.append({"columnId": DEST_ROW_COL, "value": ROW_VALUE_INSULATION})
-                mapped_cells.append({"columnId": DEST_INSULATION_COL, "value": src_insulation_val}) # Insulation column on 09 sheet with the value from 02 sheet
+                # Key the payload on dest column so a repeated column can
+                # never appear twice in one insert (Smartsheet rejects that),
+                # still one pass over the row's own populated cells.
+                mapped = {COLUMN_MAP[cid]: v for cid, v in scells.items() if cid in COLUMN_MAP}
+                mapped[DEST_PRIMERY_COL] = ROW_VALUE_INSULATION  # Primary column
+                mapped[DEST_ORDER_COL] = DEST_ORDER_VAL  # Order
+                # Force Row column in destination to Insulation
+                mapped[DEST_ROW_COL] = ROW_VALUE_INSULATION
+                mapped[DEST_INSULATION_COL] = src_insulation_val # Insulation column on 09 sheet with the value from 02 sheet
+                mapped_cells = [{"columnId": k, "value": v} for k, v in mapped.items()]
 
                 inserts.append({"toBottom": True, "cells": mapped_cells})
                 logging.info(f"[Plan] INSERT tank={tank_key} (Insulation = {src_insulation_val})")
@@ -369,9 +499,9 @@ def build_operations(
         else:
             # UPDATE always if there are diffs
             
-            dest_insulation_val = dest_cells.get(DEST_INSULATION_COL, {}).get('value')
-            src_project_manager_val = str((scells.get(SRC_PROJECT_MANAGER_COL) or {}).get("value") or "").strip()
-            dest_project_manager_val = dest_cells.get(DEST_PROJECT_MANAGER_COL, {}).get('value')
+            dest_insulation_val = dest_cells.get(DEST_INSULATION_COL)
+            src_project_manager_val = str(scells.get(SRC_PROJECT_MANAGER_COL) or "").strip()
+            dest_project_manager_val = dest_cells.get(DEST_PROJECT_MANAGER_COL)
 
             if(src_insulation_val != dest_insulation_val):
                 mapped_cells.append({"columnId": DEST_INSULATION_COL, "value": src_insulation_val}) # update the Insulation column on 09 sheet with the value from 02 sheet
@@ -396,37 +526,40 @@ def build_operations(
             # else:
             #     logging.info(f"[Plan] SKIP update tank={tank_key} (no differences)")
 
-    return inserts, updates
+    return inserts, updates, new_hashes
 
 # ---------- Bulk Ops ----------
-def bulk_insert(rows: List[Dict[str, Any]]):
-    if not rows:
-        return
-    url = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}/rows"
+# One POST for all inserts, one PUT for all updates (per 500-row limit),
+# both over the keep-alive session. Smartsheet can't literally combine the
+# two verbs, but allowPartialSuccess removes the per-row retry fallback that
+# used to amplify one bad row into a whole batch of calls.
+BULK_ROWS_URL = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}/rows?allowPartialSuccess=true"
+
+def _report_batch(op: str, batch: List[Dict[str, Any]], resp: requests.Response) -> bool:
+    """Log the batch outcome; True only when every row was confirmed."""
+    if resp.status_code >= 400:
+        logging.error(f"[SmartsheetSync] Bulk {op} failed for batch of {len(batch)} rows: {resp.text[:200]}")
+        return False
+    try:
+        failed = parse_json(resp).get("failedItems") or []
+    except ValueError:
+        failed = []
+    for item in failed:
+        logging.error(f"[SmartsheetSync] Row {op} failed: {item.get('error')}")
+    logging.info(f"[SmartsheetSync] Bulk {op}: {len(batch)} rows, {len(failed)} failed")
+    return not failed
+
+def bulk_insert(rows: List[Dict[str, Any]]) -> bool:
+    ok = True
     for batch in chunked(rows, 500):
-        resp = ss_post(url, batch)
-        if resp.status_code >= 400:
-            logging.warning(f"[SmartsheetSync] Bulk insert failed for batch of {len(batch)} rows – retrying individually.")
-            for row in batch:
-                r = ss_post(url, [row])
-                if r.status_code >= 400:
-                    logging.error(f"[SmartsheetSync] Row insert failed: {row}, response={r.text}")
-        else:
-            logging.info(f"[SmartsheetSync] Inserted batch of {len(batch)} rows")
-def bulk_update(rows: List[Dict[str, Any]]):
-    if not rows:
-        return
-    url = f"{SS_API_BASE}/sheets/{DEST_SHEET_ID}/rows"
+        ok = _report_batch("insert", batch, ss_post(BULK_ROWS_URL, batch)) and ok
+    return ok
+
+def bulk_update(rows: List[Dict[str, Any]]) -> bool:
+    ok = True
     for batch in chunked(rows, 500):
-        resp = ss_put(url, batch)
-        if resp.status_code >= 400:
-            logging.warning(f"[SmartsheetSync] Bulk update failed for batch of {len(batch)} rows – retrying individually.")
-            for row in batch:
-                r = ss_put(url, [row])
-                if r.status_code >= 400:
-                    logging.error(f"[SmartsheetSync] Row update failed: {row}, response={r.text}")
-        else:
-            logging.info(f"[SmartsheetSync] Updated batch of {len(batch)} rows")
+        ok = _report_batch("update", batch, ss_put(BULK_ROWS_URL, batch)) and ok
+    return ok
 
 # ---------- Azure Function Entry ----------
 def main(mytimer: func.TimerRequest) -> None:
@@ -434,33 +567,62 @@ def main(mytimer: func.TimerRequest) -> None:
     logging.info(f"=>[SmartsheetSync] Triggered at {to_iso_z(start_ts)}")
     logging.info(f"=>[SmartsheetSync] DRY_RUN mode is {'ON' if DRY_RUN else 'OFF'}")
 
-    #last_run = load_last_run()
-    #logging.info(f"[SmartsheetSync] Last run: {to_iso_z(last_run)}")
+    last_run = load_last_run()
+    last_full_sync = load_last_full_sync()
+    logging.info(f"[SmartsheetSync] Last run: {to_iso_z(last_run)}")
+
+    # Pull only rows modified since the last tick; fall back to a full scan
+    # when the last *full* scan is stale or FULL_SYNC_INSULATION is set.
+    # (lastRun advances every tick, so it can't drive this check.)
+    modified_since = last_run
+    if FULL_SYNC or (start_ts - last_full_sync) > dt.timedelta(hours=FULL_SYNC_MAX_AGE_HOURS):
+        logging.info("[SmartsheetSync] Doing a full source scan.")
+        modified_since = None
+        last_full_sync = start_ts
 
     try:
-        # Always full scan for correctness; paging uses /sheets/{id}
-        source_rows = list_all_source_project_rows()
+        # The source scan and dest index are independent chains of blocking
+        # GETs – overlap them so the run takes max() of the two, not the sum.
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            source_fut = ex.submit(list_all_source_project_rows, modified_since)
+            dest_fut = ex.submit(index_dest_by_tank_and_row)
+            source_rows = source_fut.result()
+            dest_index = dest_fut.result()
+
         logging.info(f"[SmartsheetSync] Source candidate rows: {len(source_rows)}")
 
         if not source_rows:
-            save_last_run(start_ts)
+            # Keep the stored signatures – overwriting without them would
+            # force a full re-plan next tick.
+            save_last_run(start_ts, load_row_hashes(), last_full_sync)
             logging.info("[SmartsheetSync] Nothing to do.")
             return
-
-        dest_index = index_dest_by_tank_and_row()
         logging.info(f"[SmartsheetSync] Indexed destination rows (Row='Insulation'): {len(dest_index)}")
 
-        inserts, updates = build_operations(source_rows, dest_index)
+        old_hashes = load_row_hashes()
+        # A full scan is also the reconciliation pass – ignore stored
+        # signatures so tanks whose earlier write failed get re-planned.
+        if modified_since is None:
+            old_hashes = {}
+        inserts, updates, new_hashes = build_operations(source_rows, dest_index, old_hashes)
         logging.info(f"[SmartsheetSync] Plan => inserts: {len(inserts)} | updates: {len(updates)}")
 
         if DRY_RUN:
             logging.warning("[SmartsheetSync] DRY_RUN mode ON – no changes will be written.")
+            # Nothing was written, so don't record the new signatures either
+            new_hashes = old_hashes
         else:
-            bulk_insert(inserts)
-            bulk_update(updates) 
+            inserts_ok = bulk_insert(inserts)
+            updates_ok = bulk_update(updates)
+            if not (inserts_ok and updates_ok):
+                # Leave the state blob untouched: advancing lastRun (or
+                # recording the signatures) past a failed write would stop
+                # the rows from ever being fetched and re-planned again.
+                logging.warning("[SmartsheetSync] Some writes failed – keeping previous sync state so the next tick retries.")
+                return
             logging.info("[SmartsheetSync] Changes committed to Smartsheet.")
 
-        save_last_run(start_ts)
+        save_last_run(start_ts, new_hashes, last_full_sync)
         logging.info("[SmartsheetSync] Done.")
     except Exception as ex:
         logging.exception(f"[identity-shaft-sync] FAILED: {ex}")
@@ -1,10 +1,23 @@
 import os
+import sys
 import json
-import time
 import logging
+import functools
 import requests
+
+try:
+    import ijson  # optional: stream-parse sheet rows to cap peak memory
+except ImportError:
+    ijson = None
+
+try:
+    import orjson  # optional: ~3-5x faster JSON encode/decode
+except ImportError:
+    orjson = None
 import azure.functions as func
+from shared_code import ss_cache
 from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -13,12 +26,17 @@ from urllib3.util.retry import Retry
 # ================================================================
 
 SS_API_BASE = "https://api.smartsheet.com/2.0"
-SMARTSHEET_TOKEN = os.environ["SMARTSHEET_ACCESS_TOKEN"]
+# Pre-bound formatters – no per-call f-string rebuild of the same URLs
+SHEET_URL = (SS_API_BASE + "/sheets/{}").format
+ROWS_URL = (SS_API_BASE + "/sheets/{}/rows").format
 
 SOURCE_SHEET_ID = 639499383033732
 SRC_COL_TANK = 3633417232797572
 SRC_COL_CITY = 818667465691012
 SRC_COL_STATE = 5322267093061508
+# Not read here – included in the source fetch so the ss_cache key matches
+# status-update's and the two functions actually share one GET per TTL.
+SRC_COL_STATUS = 1917042186473348
 
 # Load destination sheets from env
 try:
@@ -29,66 +47,132 @@ except Exception as e:
 
 DRY_RUN = os.getenv("DRY_RUN_MISSING_PROJECT", "false").lower() == "true"
 
-HEADERS = {
-    "Authorization": f"Bearer {SMARTSHEET_TOKEN}",
-    "Content-Type": "application/json"
-}
-
 MAX_BATCH = 500
-RETRY_DELAY = 3
 
 # ================================================================
 # GLOBAL SESSION (REUSED ACROSS EXECUTIONS)
 # ================================================================
 
-retry_strategy = Retry(
-    total=6,
-    connect=4,
-    read=4,
-    backoff_factor=1.5,
-    allowed_methods=["GET", "PUT"],
-    raise_on_status=False
-)
-
-adapter = HTTPAdapter(max_retries=retry_strategy)
-
-session = requests.Session()
-session.mount("https://", adapter)
-session.mount("http://", adapter)
+# Built on first use, not at import: a worker with a missing token env var
+# should fail inside main() where it's logged, not crash the host on load.
+@functools.lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    retry_strategy = Retry(
+        total=6,
+        connect=4,
+        read=4,
+        backoff_factor=1.5,
+        allowed_methods=["GET", "PUT"],
+        # Let urllib3 honour Retry-After on 429s and back off on 5xx – the
+        # old hand-rolled loop in bulk_update slept a flat 3s and, worse,
+        # counted chunks that ultimately failed as updated.
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(max_retries=retry_strategy)
+    session = requests.Session()
+    session.headers.update({
+        "Authorization": f"Bearer {os.environ['SMARTSHEET_ACCESS_TOKEN']}",
+        "Content-Type": "application/json"
+    })
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 # ================================================================
 # HELPER FUNCTIONS
 # ================================================================
 
+@functools.lru_cache(maxsize=65536)
+def _normalize_tank_str(s: str) -> str:
+    # Tank numbers repeat heavily across sheets – cache the float/int round
+    # trip on the already-stringified value.
+    try:
+        return str(int(float(s)))
+    except ValueError:
+        return s.lower()
+
 def normalize_tank(value: Any) -> str:
     """Normalize tank number as integer-like string (e.g., 010 → 10)."""
-    if value is None or str(value).strip() == "":
+    if value is None:
         return ""
-    try:
-        return str(int(float(str(value).strip())))
-    except ValueError:
-        return str(value).strip().lower()
+    s = str(value).strip()
+    if not s:
+        return ""
+    return _normalize_tank_str(s)
 
 
 def extract_key(row: Dict[str, Any], tank_col: int, city_col: int, state_col: int) -> str:
     """Return normalized composite key tank|city|state, skipping incomplete rows."""
-    cells = {c["columnId"]: c.get("value") for c in row.get("cells", [])}
-    tank = normalize_tank(cells.get(tank_col))
-    city = str(cells.get(city_col) or "").strip().lower()
-    state = str(cells.get(state_col) or "").strip().lower()
+    # Single pass over the cell list with an early exit – building a full
+    # {columnId: value} dict per row just to read three columns was the
+    # hottest allocation in the sync.
+    tank_v = city_v = state_v = None
+    for c in row.get("cells", []):
+        cid = c["columnId"]
+        if cid == tank_col:
+            tank_v = c.get("value")
+        elif cid == city_col:
+            city_v = c.get("value")
+        elif cid == state_col:
+            state_v = c.get("value")
+        if tank_v is not None and city_v is not None and state_v is not None:
+            break
+    if tank_v is None or city_v is None or state_v is None:
+        # Incomplete row – bail before paying for normalize/strip/lower
+        return ""
+    tank = normalize_tank(tank_v)
+    city = str(city_v).strip().lower()
+    state = str(state_v).strip().lower()
     if not tank or not city or not state:
         return ""
     return f"{tank}|{city}|{state}"
 
 
-def get_all_rows(sheet_id: int) -> List[Dict[str, Any]]:
+def extract_key_and_value(row: Dict[str, Any], tank_col: int, city_col: int,
+                          state_col: int, extra_col: int):
+    """extract_key plus one extra cell value, in the same single pass."""
+    tank_v = city_v = state_v = extra_v = None
+    for c in row.get("cells", []):
+        cid = c["columnId"]
+        if cid == tank_col:
+            tank_v = c.get("value")
+        elif cid == city_col:
+            city_v = c.get("value")
+        elif cid == state_col:
+            state_v = c.get("value")
+        elif cid == extra_col:
+            extra_v = c.get("value")
+    if tank_v is None or city_v is None or state_v is None:
+        return "", extra_v
+    tank = normalize_tank(tank_v)
+    city = str(city_v).strip().lower()
+    state = str(state_v).strip().lower()
+    if not tank or not city or not state:
+        return "", extra_v
+    return f"{tank}|{city}|{state}", extra_v
+
+
+def get_all_rows(sheet_id: int, col_ids: List[int] = None) -> List[Dict[str, Any]]:
     """Fetch all rows from a Smartsheet sheet (bulk GET)."""
-    url = f"{SS_API_BASE}/sheets/{sheet_id}"
+    # Only transfer the columns the caller reads – big payload cut
+    params = {"columnIds": ",".join(map(str, col_ids))} if col_ids else None
     try:
-        resp = session.get(url, headers=HEADERS, timeout=30)
+        resp = get_session().get(SHEET_URL(sheet_id), params=params, timeout=30, stream=True)
         resp.raise_for_status()
+        if ijson is not None:
+            # Decode rows as they stream off the socket instead of holding
+            # the raw body and the parsed tree in memory at once.
+            resp.raw.decode_content = True
+            # use_float: keep floats as float (ijson defaults to Decimal,
+            # which json/orjson refuse to serialize in update payloads)
+            return list(ijson.items(resp.raw, "rows.item", use_float=True))
+        if orjson is not None:
+            return orjson.loads(resp.content).get("rows", [])
         return resp.json().get("rows", [])
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # ValueError = malformed JSON body; with fetches running in a pool an
+        # escape here would take down every other sheet's processing too
         logging.error(f"⚠️  Failed to fetch rows for sheet {sheet_id}: {e}")
         return []
 
@@ -99,37 +183,25 @@ def bulk_update(sheet_id: int, updates: List[Dict[str, Any]]) -> int:
 
     for i in range(0, len(updates), MAX_BATCH):
         chunk = updates[i:i + MAX_BATCH]
-        url = f"{SS_API_BASE}/sheets/{sheet_id}/rows"
 
         if DRY_RUN:
             total += len(chunk)
             continue
 
-        for attempt in range(2):
-            resp = session.put(
-                url,
-                headers=HEADERS,
-                data=json.dumps(chunk),
-                timeout=30
+        # Retries (429 + 5xx, with Retry-After/backoff) happen inside the
+        # session adapter; only confirmed 2xx chunks count toward the total.
+        resp = get_session().put(
+            ROWS_URL(sheet_id),
+            data=(orjson.dumps(chunk) if orjson is not None else json.dumps(chunk)),
+            timeout=30
+        )
+        if resp.ok:
+            total += len(chunk)
+        else:
+            logging.error(
+                f"❌ Failed updating sheet {sheet_id}: {resp.status_code} | {resp.text[:150]}"
             )
 
-            if resp.status_code == 429:
-                logging.warning(
-                    f"⏳ Rate limited on sheet {sheet_id}, retrying in {RETRY_DELAY}s..."
-                )
-                time.sleep(RETRY_DELAY)
-                continue
-
-            try:
-                resp.raise_for_status()
-            except Exception as e:
-                logging.error(
-                    f"❌ Failed updating sheet {sheet_id}: {e} | {resp.text[:150]}"
-                )
-            break
-
-        total += len(chunk)
-
     return total
 
 
@@ -159,49 +231,95 @@ def main(mytimer: func.TimerRequest) -> None:
         return
 
     try:
-        # 1️⃣ Load source keys
-        src_rows = get_all_rows(SOURCE_SHEET_ID)
-        src_keys = {
-            k for r in src_rows
+        total_updates = 0
+        results = []
+
+        # 1️⃣ Fire the source fetch and every (valid) destination fetch in
+        # parallel – each one blocks on an HTTPS round trip, so serializing
+        # them made wall time the sum of all sheet latencies.
+        valid_dests = []
+        for dest in DEST_SHEETS:
+            if validate_dest_sheet(dest):
+                valid_dests.append(dest)
+            else:
+                results.append(f"⚠️  {dest.get('sheet_name', dest.get('sheet_id'))}: Skipped (invalid column mapping)")
+
+        sids = [d["sheet_id"] for d in valid_dests]
+        with ThreadPoolExecutor(max_workers=min(16, len(sids) + 1)) as ex:
+            # The sibling timer functions fetch this same sheet each tick;
+            # the shared TTL cache dedupes co-located fetches.
+            src_future = ex.submit(ss_cache.get_rows, SOURCE_SHEET_ID, get_all_rows,
+                                   [SRC_COL_TANK, SRC_COL_CITY, SRC_COL_STATE, SRC_COL_STATUS])
+            dest_futures = {
+                d["sheet_id"]: ex.submit(
+                    get_all_rows, d["sheet_id"],
+                    [d["cols"]["tank"], d["cols"]["city"], d["cols"]["state"], d["cols"]["missing"]])
+                for d in valid_dests
+            }
+            src_rows = src_future.result()
+            rows_by_sid = {sid: fut.result() for sid, fut in dest_futures.items()}
+
+        if not src_rows:
+            # An empty source is indistinguishable from a failed fetch here,
+            # and treating it as real would flag every project as missing.
+            logging.warning("⚠️  Source sheet returned no rows – skipping this tick.")
+            return
+
+        # Interned keys make set probes pointer-compares on hits, and the
+        # frozenset is the immutable fast path for `in`.
+        src_keys = frozenset(
+            sys.intern(k) for r in src_rows
             if (k := extract_key(r, SRC_COL_TANK, SRC_COL_CITY, SRC_COL_STATE))
-        }
+        )
 
         logging.info(
             f"✅ Loaded {len(src_keys)} source project keys from Sheet {SOURCE_SHEET_ID}"
         )
 
-        total_updates = 0
-        results = []
-
         # 2️⃣ Process each destination sheet
-        for dest in DEST_SHEETS:
+        for dest in valid_dests:
             sid = dest.get("sheet_id")
             name = dest.get("sheet_name", str(sid))
             cols = dest.get("cols", {})
 
-            if not validate_dest_sheet(dest):
-                results.append(f"⚠️  {name}: Skipped (invalid column mapping)")
-                continue
-
             try:
                 logging.info(f"🔍 Processing sheet: {name} (ID: {sid})")
-                dest_rows = get_all_rows(sid)
+                dest_rows = rows_by_sid.get(sid, [])
 
                 if not dest_rows:
                     results.append(f"⚠️  {name}: No data or fetch error")
                     continue
 
-                updates = []
                 missing_col = cols["missing"]
 
+                # Collect keys + current flags in one pass, then let the
+                # C-level set difference decide what is missing; only rows
+                # whose flag actually flips produce an update.
+                entries = []
+                dest_keys = set()
                 for row in dest_rows:
-                    key = extract_key(row, cols["tank"], cols["city"], cols["state"])
-                    is_missing = bool(key and key not in src_keys)
+                    key, current = extract_key_and_value(
+                        row, cols["tank"], cols["city"], cols["state"], missing_col)
+                    if key:
+                        key = sys.intern(key)
+                        dest_keys.add(key)
+                    entries.append((key, row["id"], current))
 
-                    updates.append({
-                        "id": row["id"],
-                        "cells": [{"columnId": missing_col, "value": is_missing}]
-                    })
+                missing_keys = dest_keys - src_keys
+
+                updates = []
+                for key, row_id, current in entries:
+                    if key and key in missing_keys:
+                        if current is not True:
+                            updates.append({
+                                "id": row_id,
+                                "cells": [{"columnId": missing_col, "value": True}]
+                            })
+                    elif current is True:
+                        updates.append({
+                            "id": row_id,
+                            "cells": [{"columnId": missing_col, "value": False}]
+                        })
 
                 if updates:
                     count = bulk_update(sid, updates)
@@ -1,8 +1,15 @@
 import json
 import os
 import logging
+import functools
 import uuid
 import requests
+
+try:
+    import orjson  # optional: ~3-5x faster JSON encode/decode
+except ImportError:
+    orjson = None
+
 import azure.functions as func
 import mssql
 from typing import Dict
@@ -11,14 +18,23 @@ from typing import Dict
 # CONFIG
 # ================================================================
 SS_API_BASE = "https://api.smartsheet.com/2.0"
-SMARTSHEET_TOKEN = os.environ["SMARTSHEET_ACCESS_TOKEN"]
+SHEET_URL = (SS_API_BASE + "/sheets/{}").format
+ROWS_URL = (SS_API_BASE + "/sheets/{}/rows").format
 
 DRY_RUN = os.getenv("DRY_RUN_SMARTSHEET_UPDATER", "false").lower() == "true"
 
-HEADERS = {
-    "Authorization": f"Bearer {SMARTSHEET_TOKEN}",
-    "Content-Type": "application/json"
-}
+# Pooled keep-alive session: every get_sheet/update_row used to pay a fresh
+# TCP+TLS handshake through requests.api. Built lazily so the token env var
+# is read per worker on first use, not at import.
+@functools.lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update({
+        "Authorization": f"Bearer {os.environ['SMARTSHEET_ACCESS_TOKEN']}",
+        "Content-Type": "application/json"
+    })
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0))
+    return session
 
 # ================================================================
 # SHEET ID MAPPING (AUTHORITATIVE)
@@ -52,47 +68,62 @@ def ai_log(level: str, message: str, **props):
 # ================================================================
 # SQL CONNECTION + AUDIT LOGGING
 # ================================================================
+@functools.lru_cache(maxsize=1)
+def _sql_config() -> dict:
+    # Resolved once per worker instead of four environ lookups per connect
+    return {
+        "server": os.environ["SQL_SERVER"],
+        "user": os.environ["SQL_USERNAME"],
+        "password": os.environ["SQL_PASSWORD"],
+        "database": os.environ["SQL_DB"],
+    }
+
 def get_sql_conn():
-    return mssql.connect(
-        server=os.environ["SQL_SERVER"],
-        user=os.environ["SQL_USERNAME"],
-        password=os.environ["SQL_PASSWORD"],
-        database=os.environ["SQL_DB"],
-        encrypt=True
-    )
+    return mssql.connect(encrypt=True, **_sql_config())
 
-def log_audit(**kwargs):
+_AUDIT_INSERT_SQL = """
+    INSERT INTO dbo.ProjectSmartsheetAuditLog (
+        Direction, Operation, SheetId, RowId,
+        JobNumber, Department, City, State,
+        Success, Message, PerformedBy
+    )
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+
+# Audit rows are buffered per request and flushed in one executemany – the
+# old per-event connect/insert/commit/close cost a SQL handshake for every
+# audited row (two per matched job). The buffer is created inside main and
+# passed around explicitly so concurrent invocations can't interleave.
+
+def log_audit(buffer: list, **kwargs):
+    buffer.append((
+        kwargs.get("direction"),
+        kwargs.get("operation"),
+        kwargs.get("sheet_id"),
+        kwargs.get("row_id"),
+        kwargs.get("job_number"),
+        kwargs.get("department"),
+        kwargs.get("city"),
+        kwargs.get("state"),
+        kwargs.get("success"),
+        kwargs.get("message"),
+        kwargs.get("user")
+    ))
+
+def flush_audit(rows: list):
     """Audit logging must NEVER throw"""
+    if not rows:
+        return
     try:
         conn = get_sql_conn()
         cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO dbo.ProjectSmartsheetAuditLog (
-                Direction, Operation, SheetId, RowId,
-                JobNumber, Department, City, State,
-                Success, Message, PerformedBy
-            )
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """,
-            (
-                kwargs.get("direction"),
-                kwargs.get("operation"),
-                kwargs.get("sheet_id"),
-                kwargs.get("row_id"),
-                kwargs.get("job_number"),
-                kwargs.get("department"),
-                kwargs.get("city"),
-                kwargs.get("state"),
-                kwargs.get("success"),
-                kwargs.get("message"),
-                kwargs.get("user")
-            )
-        )
+        if hasattr(cur, "fast_executemany"):
+            cur.fast_executemany = True
+        cur.executemany(_AUDIT_INSERT_SQL, rows)
         conn.commit()
         conn.close()
     except Exception as e:
-        logging.error(f"[AUDIT] Failed to log audit row: {e}")
+        logging.error(f"[AUDIT] Failed to flush {len(rows)} audit rows: {e}")
 
 # ================================================================
 # HELPERS
@@ -107,26 +138,29 @@ def resolve_candidate_sheets(obj: dict):
     return [DEPARTMENT_SHEET_MAP[dept]]
 
 def get_sheet(sheet_id: int):
-    resp = requests.get(f"{SS_API_BASE}/sheets/{sheet_id}", headers=HEADERS, timeout=20)
+    resp = get_session().get(SHEET_URL(sheet_id), timeout=20)
     resp.raise_for_status()
+    if orjson is not None:
+        return orjson.loads(resp.content)
     return resp.json()
 
 def get_column_map(sheet: dict) -> Dict[str, int]:
     return {c["title"]: c["id"] for c in sheet["columns"]}
 
-def row_matcher(row: dict, obj: dict, col_map: dict) -> bool:
-    def cell(col):
-        cid = col_map.get(col)
-        for c in row["cells"]:
-            if c["columnId"] == cid:
-                return normalize(c.get("displayValue") or c.get("value"))
-        return ""
-
-    return (
-        cell("Tank #") == normalize(obj["jobNumber"]) and
-        cell("City") == normalize(obj["city"]) and
-        cell("State") == normalize(obj["state"])
-    )
+def build_row_index(sheet: dict, col_map: dict) -> dict:
+    """(tank, city, state) -> row, built once per sheet.
+
+    Replaces the per-object row_matcher scan that walked every cell of
+    every row for each payload entry (O(payload x rows x cells))."""
+    tank_id = col_map.get("Tank #")
+    city_id = col_map.get("City")
+    state_id = col_map.get("State")
+    index = {}
+    for row in sheet["rows"]:
+        vals = {c["columnId"]: normalize(c.get("displayValue") or c.get("value")) for c in row["cells"]}
+        key = (vals.get(tank_id, ""), vals.get(city_id, ""), vals.get(state_id, ""))
+        index.setdefault(key, row)
+    return index
 
 def build_smartsheet_updates(obj: dict, col_map: dict):
     MS_TO_SS = {
@@ -145,15 +179,16 @@ def build_smartsheet_updates(obj: dict, col_map: dict):
             })
     return cells
 
-def update_row(sheet_id: int, row_id: int, cells: list):
-    if DRY_RUN:
+def update_rows(sheet_id: int, rows: list):
+    """Bulk PUT – Smartsheet takes up to 500 row updates per call."""
+    if DRY_RUN or not rows:
         return
 
-    payload = {"rows": [{"id": row_id, "cells": cells}]}
-    resp = requests.put(
-        f"{SS_API_BASE}/sheets/{sheet_id}/rows",
-        headers=HEADERS,
-        json=payload,
+    payload = {"rows": rows}
+    body = orjson.dumps(payload) if orjson is not None else json.dumps(payload)
+    resp = get_session().put(
+        ROWS_URL(sheet_id),
+        data=body,
         timeout=20
     )
     resp.raise_for_status()
@@ -187,11 +222,17 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         dryRun=DRY_RUN
     )
 
+    audit_buffer: list = []  # this request's audit rows, flushed in finally
+
     try:
         payload = req.get_json()
-        results = []
+        # One result slot per payload object so the response keeps payload
+        # order even though the PUTs are flushed per sheet after the loop
+        results = [None] * len(payload)
+        sheet_cache = {}  # sheet_id -> (sheet, col_map, row_index) for this request
+        pending = {}      # sheet_id -> matched entries awaiting one bulk PUT
 
-        for obj in payload:
+        for idx, obj in enumerate(payload):
             ai_log(
                 "info",
                 "Processing job",
@@ -203,91 +244,41 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             matched = False
 
             for sheet_id in resolve_candidate_sheets(obj):
-                sheet = get_sheet(sheet_id)
-                col_map = get_column_map(sheet)
-
-                for row in sheet["rows"]:
-                    if row_matcher(row, obj, col_map):
-                        matched = True
-                        row_id = row["id"]
-
-                        ai_log(
-                            "info",
-                            "Matched Smartsheet row",
-                            correlationId=correlation_id,
-                            sheetId=sheet_id,
-                            rowId=row_id
-                        )
-
-                        try:
-                            cells = build_smartsheet_updates(obj, col_map)
-                            update_row(sheet_id, row_id, cells)
-
-                            log_audit(
-                                direction="MSP_TO_SS",
-                                operation="UPDATE_ROW",
-                                success=True,
-                                user=caller,
-                                sheet_id=sheet_id,
-                                row_id=row_id,
-                                job_number=obj["jobNumber"],
-                                department=obj["department"],
-                                city=obj["city"],
-                                state=obj["state"]
-                            )
-
-                            return_vals = extract_return_values(row, col_map)
-
-                            log_audit(
-                                direction="SS_TO_MSP",
-                                operation="RETURN_VALUES",
-                                success=True,
-                                user=caller,
-                                sheet_id=sheet_id,
-                                row_id=row_id,
-                                job_number=obj["jobNumber"],
-                                department=obj["department"],
-                                city=obj["city"],
-                                state=obj["state"]
-                            )
-
-                            results.append({
-                                **obj,
-                                "smartsheet": {
-                                    "sheetId": sheet_id,
-                                    "rowId": row_id,
-                                    "values": return_vals
-                                }
-                            })
-
-                        except Exception as e:
-                            ai_log(
-                                "error",
-                                "Smartsheet update failed",
-                                correlationId=correlation_id,
-                                sheetId=sheet_id,
-                                rowId=row_id,
-                                error=str(e)
-                            )
-
-                            log_audit(
-                                direction="MSP_TO_SS",
-                                operation="UPDATE_ROW",
-                                success=False,
-                                user=caller,
-                                sheet_id=sheet_id,
-                                row_id=row_id,
-                                job_number=obj["jobNumber"],
-                                department=obj["department"],
-                                city=obj["city"],
-                                state=obj["state"],
-                                message=str(e)
-                            )
-                            raise
-
-                        break
-
-                if matched:
+                # Fetch + index each sheet once per request, even when many
+                # payload objects resolve to the same sheet
+                cached = sheet_cache.get(sheet_id)
+                if cached is None:
+                    sheet = get_sheet(sheet_id)
+                    col_map = get_column_map(sheet)
+                    cached = (sheet, col_map, build_row_index(sheet, col_map))
+                    sheet_cache[sheet_id] = cached
+                sheet, col_map, row_index = cached
+
+                row = row_index.get((
+                    normalize(obj["jobNumber"]),
+                    normalize(obj["city"]),
+                    normalize(obj["state"]),
+                ))
+                if row is not None:
+                    matched = True
+
+                    ai_log(
+                        "info",
+                        "Matched Smartsheet row",
+                        correlationId=correlation_id,
+                        sheetId=sheet_id,
+                        rowId=row["id"]
+                    )
+
+                    # Collect the cell updates; the PUTs are batched per
+                    # sheet after the loop instead of one call per job
+                    pending.setdefault(sheet_id, []).append({
+                        "idx": idx,
+                        "obj": obj,
+                        "row": row,
+                        "cells": build_smartsheet_updates(obj, col_map),
+                        "col_map": col_map,
+                    })
                     break
 
             if not matched:
@@ -297,7 +288,84 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
                     correlationId=correlation_id,
                     jobNumber=obj.get("jobNumber")
                 )
-                results.append({**obj, "error": "No matching Smartsheet row found"})
+                results[idx] = {**obj, "error": "No matching Smartsheet row found"}
+
+        # One bulk PUT per distinct sheet – round trips drop from
+        # O(payload) to O(sheets)
+        for sheet_id, entries in pending.items():
+            try:
+                # Rows with no mapped cells are no-ops; keep them out of the
+                # payload so they can't fail the batch for everyone else
+                update_rows(sheet_id, [{"id": e["row"]["id"], "cells": e["cells"]}
+                                       for e in entries if e["cells"]])
+            except Exception as e:
+                ai_log(
+                    "error",
+                    "Smartsheet bulk update failed",
+                    correlationId=correlation_id,
+                    sheetId=sheet_id,
+                    error=str(e)
+                )
+                for entry in entries:
+                    obj = entry["obj"]
+                    log_audit(
+                        audit_buffer,
+                        direction="MSP_TO_SS",
+                        operation="UPDATE_ROW",
+                        success=False,
+                        user=caller,
+                        sheet_id=sheet_id,
+                        row_id=entry["row"]["id"],
+                        job_number=obj["jobNumber"],
+                        department=obj["department"],
+                        city=obj["city"],
+                        state=obj["state"],
+                        message=str(e)
+                    )
+                raise
+
+            for entry in entries:
+                obj = entry["obj"]
+                row = entry["row"]
+
+                log_audit(
+                    audit_buffer,
+                    direction="MSP_TO_SS",
+                    operation="UPDATE_ROW",
+                    success=True,
+                    user=caller,
+                    sheet_id=sheet_id,
+                    row_id=row["id"],
+                    job_number=obj["jobNumber"],
+                    department=obj["department"],
+                    city=obj["city"],
+                    state=obj["state"]
+                )
+
+                return_vals = extract_return_values(row, entry["col_map"])
+
+                log_audit(
+                    audit_buffer,
+                    direction="SS_TO_MSP",
+                    operation="RETURN_VALUES",
+                    success=True,
+                    user=caller,
+                    sheet_id=sheet_id,
+                    row_id=row["id"],
+                    job_number=obj["jobNumber"],
+                    department=obj["department"],
+                    city=obj["city"],
+                    state=obj["state"]
+                )
+
+                results[entry["idx"]] = {
+                    **obj,
+                    "smartsheet": {
+                        "sheetId": sheet_id,
+                        "rowId": row["id"],
+                        "values": return_vals
+                    }
+                }
 
         ai_log(
             "info",
@@ -306,25 +374,31 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             processed=len(results)
         )
 
+        body = {
+            "status": "ok",
+            "dryRun": DRY_RUN,
+            "correlationId": correlation_id,
+            "results": results
+        }
         return func.HttpResponse(
-            json.dumps({
-                "status": "ok",
-                "dryRun": DRY_RUN,
-                "correlationId": correlation_id,
-                "results": results
-            }),
+            orjson.dumps(body) if orjson is not None else json.dumps(body),
             mimetype="application/json",
             status_code=200
         )
 
     except Exception as e:
         logging.exception("[FATAL] Integration failed")
+        err = {
+            "status": "error",
+            "correlationId": correlation_id,
+            "message": str(e)
+        }
         return func.HttpResponse(
-            json.dumps({
-                "status": "error",
-                "correlationId": correlation_id,
-                "message": str(e)
-            }),
+            orjson.dumps(err) if orjson is not None else json.dumps(err),
             mimetype="application/json",
             status_code=500
         )
+    finally:
+        # One SQL round trip for every audit row of this request,
+        # success or failure path alike
+        flush_audit(audit_buffer)
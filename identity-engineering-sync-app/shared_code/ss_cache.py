@@ -0,0 +1,39 @@
+"""Tiny in-process TTL cache for Smartsheet row fetches.
+
+Several timer functions (project-missing-check, its copy, status-update)
+pull the same source sheet on 1-minute schedules. When they land on the
+same worker, a short TTL lets them share one fetch instead of each paying
+the full GET.
+"""
+import time
+import threading
+from typing import Any, Dict, List, Tuple
+
+TTL_SECONDS = 30
+
+_lock = threading.Lock()
+_cache: Dict[Tuple, Tuple[float, List[Any]]] = {}
+
+
+def get_rows(sheet_id: int, fetcher, col_ids: List[int] = None) -> List[Any]:
+    """Return fetcher(sheet_id[, col_ids]) with a TTL cache in front.
+
+    The cache key includes the column filter, so callers asking for
+    different column subsets don't see each other's trimmed payloads.
+    """
+    key = (sheet_id, tuple(col_ids) if col_ids else None)
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(key)
+        if hit and (now - hit[0]) < TTL_SECONDS:
+            return hit[1]
+
+    rows = fetcher(sheet_id, col_ids) if col_ids is not None else fetcher(sheet_id)
+
+    # The fetchers return [] on request/parse errors. Never cache that –
+    # serving a failed fetch to every sibling for a whole TTL window would
+    # make them all act on an "empty" sheet.
+    if rows:
+        with _lock:
+            _cache[key] = (time.monotonic(), rows)
+    return rows
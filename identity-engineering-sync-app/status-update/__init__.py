@@ -1,18 +1,34 @@
 import os
+import sys
 import json
-import time
 import logging
+import functools
 import requests
+
+try:
+    import ijson  # optional: stream-parse sheet rows to cap peak memory
+except ImportError:
+    ijson = None
+
+try:
+    import orjson  # optional: ~3-5x faster JSON encode/decode
+except ImportError:
+    orjson = None
 import csv
 import azure.functions as func
+from shared_code import ss_cache
 from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # ================================================================
 # CONFIGURATION
 # ================================================================
 
 SS_API_BASE = "https://api.smartsheet.com/2.0"
-SMARTSHEET_TOKEN = os.environ["SMARTSHEET_ACCESS_TOKEN"]
+SHEET_URL = (SS_API_BASE + "/sheets/{}").format
+ROWS_URL = (SS_API_BASE + "/sheets/{}/rows").format
 
 SOURCE_SHEET_ID = 639499383033732
 SRC_COL_TANK = 3633417232797572
@@ -29,48 +45,94 @@ except Exception as e:
 
 DRY_RUN = os.getenv("DRY_RUN_STATUS_UPDATE", "false").lower() == "true"
 
-HEADERS = {
-    "Authorization": f"Bearer {SMARTSHEET_TOKEN}",
-    "Content-Type": "application/json"
-}
-
 MAX_BATCH = 500
-RETRY_DELAY = 3
 CSV_LOG_PATH = "/tmp/status_changes.csv"  # optional audit log
 
+# Keep-alive session shared by every GET/PUT, built on first use so env
+# resolution happens inside main() rather than at worker import
+@functools.lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update({
+        "Authorization": f"Bearer {os.environ['SMARTSHEET_ACCESS_TOKEN']}",
+        "Content-Type": "application/json"
+    })
+    session.mount("https://", HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.5,
+                          status_forcelist=[429, 500, 502, 503, 504],
+                          allowed_methods=["GET", "PUT"]),
+    ))
+    return session
+
 # ================================================================
 # HELPER FUNCTIONS
 # ================================================================
 
+@functools.lru_cache(maxsize=65536)
+def _normalize_tank_str(s: str) -> str:
+    # Tank numbers repeat heavily across sheets – cache the float/int round
+    # trip on the already-stringified value.
+    try:
+        return str(int(float(s)))
+    except ValueError:
+        return s.lower()
+
 def normalize_tank(value: Any) -> str:
     """Normalize tank number (e.g., 010 → 10)."""
-    if value is None or str(value).strip() == "":
+    if value is None:
         return ""
-    try:
-        return str(int(float(str(value).strip())))
-    except ValueError:
-        return str(value).strip().lower()
+    s = str(value).strip()
+    if not s:
+        return ""
+    return _normalize_tank_str(s)
 
 
 def extract_key(row: Dict[str, Any], tank_col: int, city_col: int, state_col: int) -> str:
     """Return normalized composite key tank|city|state, skipping incomplete rows."""
-    cells = {c["columnId"]: c.get("value") for c in row.get("cells", [])}
-    tank = normalize_tank(cells.get(tank_col))
-    city = str(cells.get(city_col) or "").strip().lower()
-    state = str(cells.get(state_col) or "").strip().lower()
+    # One pass over the cell list, early exit once all three columns are
+    # seen – no more throwaway {columnId: value} dict per row.
+    tank_v = city_v = state_v = None
+    for c in row.get("cells", []):
+        cid = c["columnId"]
+        if cid == tank_col:
+            tank_v = c.get("value")
+        elif cid == city_col:
+            city_v = c.get("value")
+        elif cid == state_col:
+            state_v = c.get("value")
+        if tank_v is not None and city_v is not None and state_v is not None:
+            break
+    if tank_v is None or city_v is None or state_v is None:
+        # Incomplete row – bail before paying for normalize/strip/lower
+        return ""
+    tank = normalize_tank(tank_v)
+    city = str(city_v).strip().lower()
+    state = str(state_v).strip().lower()
     if not tank or not city or not state:
         return ""
     return f"{tank}|{city}|{state}"
 
 
-def get_all_rows(sheet_id: int) -> List[Dict[str, Any]]:
+def get_all_rows(sheet_id: int, col_ids: List[int] = None) -> List[Dict[str, Any]]:
     """Fetch all rows from a Smartsheet sheet."""
-    url = f"{SS_API_BASE}/sheets/{sheet_id}"
+    # Only transfer the columns the caller reads – big payload cut
+    params = {"columnIds": ",".join(map(str, col_ids))} if col_ids else None
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=60)
+        resp = get_session().get(SHEET_URL(sheet_id), params=params, timeout=60, stream=True)
         resp.raise_for_status()
+        if ijson is not None:
+            resp.raw.decode_content = True
+            # use_float: keep floats as float (ijson defaults to Decimal,
+            # which json/orjson refuse to serialize in update payloads)
+            return list(ijson.items(resp.raw, "rows.item", use_float=True))
+        if orjson is not None:
+            return orjson.loads(resp.content).get("rows", [])
         return resp.json().get("rows", [])
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # ValueError = malformed JSON body; with fetches running in a pool an
+        # escape here would take down every other sheet's processing too
         logging.error(f"⚠️  Failed to fetch rows for sheet {sheet_id}: {e}")
         return []
 
@@ -80,25 +142,18 @@ def bulk_update(sheet_id: int, updates: List[Dict[str, Any]]) -> int:
     total = 0
     for i in range(0, len(updates), MAX_BATCH):
         chunk = updates[i:i + MAX_BATCH]
-        url = f"{SS_API_BASE}/sheets/{sheet_id}/rows"
 
         if DRY_RUN:
             total += len(chunk)
             continue
 
-        for attempt in range(2):
-            resp = requests.put(url, headers=HEADERS, data=json.dumps(chunk))
-            if resp.status_code == 429:
-                logging.warning(f"⏳ Rate limited on {sheet_id}, retrying in {RETRY_DELAY}s...")
-                time.sleep(RETRY_DELAY)
-                continue
-            try:
-                resp.raise_for_status()
-            except Exception as e:
-                logging.error(f"❌ Failed updating sheet {sheet_id}: {e} | {resp.text[:150]}")
-            break
-
-        total += len(chunk)
+        # Session-level Retry handles 429 (with Retry-After) and 5xx; count
+        # only chunks Smartsheet actually accepted.
+        resp = get_session().put(ROWS_URL(sheet_id), data=(orjson.dumps(chunk) if orjson is not None else json.dumps(chunk)))
+        if resp.ok:
+            total += len(chunk)
+        else:
+            logging.error(f"❌ Failed updating sheet {sheet_id}: {resp.status_code} | {resp.text[:150]}")
     return total
 
 
@@ -127,68 +182,96 @@ def main(mytimer: func.TimerRequest) -> None:
         logging.warning("⚠️  No destination sheets configured. Exiting.")
         return
 
+    csv_file = None
     try:
-        # 1️⃣ Load all source rows and build lookup: key → status_value
-        src_rows = get_all_rows(SOURCE_SHEET_ID)
+        # Kick off the source fetch and all destination fetches together –
+        # every get_all_rows is a blocking round trip to Smartsheet.
+        valid_dests = [d for d in DEST_SHEETS if validate_dest_sheet(d)]
+        sids = [d["sheet_id"] for d in valid_dests]
+        with ThreadPoolExecutor(max_workers=min(16, len(sids) + 1)) as ex:
+            src_future = ex.submit(ss_cache.get_rows, SOURCE_SHEET_ID, get_all_rows,
+                                   [SRC_COL_TANK, SRC_COL_CITY, SRC_COL_STATE, SRC_COL_STATUS])
+            dest_futures = {
+                d["sheet_id"]: ex.submit(
+                    get_all_rows, d["sheet_id"],
+                    [d["cols"]["tank"], d["cols"]["city"], d["cols"]["state"], d["cols"]["status"]])
+                for d in valid_dests
+            }
+            src_rows = src_future.result()
+            rows_by_sid = {sid: fut.result() for sid, fut in dest_futures.items()}
+
+        # 1️⃣ Build lookup from source rows: key → status_value
         src_map = {}
         for r in src_rows:
             key = extract_key(r, SRC_COL_TANK, SRC_COL_CITY, SRC_COL_STATE)
             if not key:
                 continue
             cells = {c["columnId"]: c.get("value") for c in r.get("cells", [])}
-            src_map[key] = cells.get(SRC_COL_STATUS, "")
+            # Strip once at build time and intern – status labels come from a
+            # tiny vocabulary, so the per-row compare below is usually a
+            # pointer-equality hit.
+            src_map[key] = sys.intern(str(cells.get(SRC_COL_STATUS) or "").strip())
 
         logging.info(f"✅ Loaded {len(src_map)} source project status values from Sheet {SOURCE_SHEET_ID}")
 
         total_updates = 0
-        all_changes = []  # for CSV
+        total_changes = 0
         csv_header = ["Sheet Name", "Row ID", "Tank", "City", "State", "Old Status", "New Status"]
+        # Stream the audit CSV as changes are found instead of buffering an
+        # O(changes) list and writing it only on the success path.
+        csv_file = None
+        csv_writer = None
 
         # 2️⃣ Process each destination sheet
-        for dest in DEST_SHEETS:
+        for dest in valid_dests:
             sid = dest.get("sheet_id")
             name = dest.get("sheet_name", str(sid))
             cols = dest.get("cols", {})
 
-            if not validate_dest_sheet(dest):
-                logging.warning(f"⚠️  {name}: Skipped (invalid mapping)")
-                continue
-
             try:
                 logging.info(f"🔍 Processing sheet: {name} (ID: {sid})")
-                dest_rows = get_all_rows(sid)
+                dest_rows = rows_by_sid.get(sid, [])
                 if not dest_rows:
                     logging.warning(f"⚠️  {name}: No data or fetch error")
                     continue
 
                 updates = []
+                log_debug = logging.getLogger().isEnabledFor(logging.DEBUG)
                 for row in dest_rows:
-                    cells = {c["columnId"]: c.get("value") for c in row.get("cells", [])}
-                    tank = normalize_tank(cells.get(cols["tank"]))
-                    city = str(cells.get(cols["city"]) or "").strip()
-                    state = str(cells.get(cols["state"]) or "").strip()
-                    dest_status = (cells.get(cols["status"]) or "").strip() if cells.get(cols["status"]) else ""
+                    # One extract_key call per row – the old loop re-did the
+                    # normalize_tank/strip/lower work inline (with slightly
+                    # different rules) on top of what extract_key provides.
+                    key = extract_key(row, cols["tank"], cols["city"], cols["state"])
+                    if not key:
+                        continue
 
-                    key = f"{tank}|{city.lower()}|{state.lower()}"
-                    src_status = (src_map.get(key) or "").strip()
+                    cells = {c["columnId"]: c.get("value") for c in row.get("cells", [])}
+                    dest_status = sys.intern(str(cells.get(cols["status"]) or "").strip())
+                    src_status = src_map.get(key, "")  # already stripped at build time
 
                     # Skip if both statuses are blank or None
                     if (not src_status) and (not dest_status):
                         continue
 
-                    # Skip if no key or no identifying data
-                    if not key or (tank == "" and city == "" and state == ""):
-                        continue
-
                     # ✅ Only update when different
                     if src_status != dest_status:
-                        logging.info(f"🟡 {name}: Row {row['id']} ({tank}, {city}, {state}) "
-                                     f"will change from '{dest_status}' → '{src_status}'")
+                        tank, city, state = key.split("|", 2)
+                        if log_debug:
+                            logging.debug(f"🟡 {name}: Row {row['id']} ({tank}, {city}, {state}) "
+                                          f"will change from '{dest_status}' → '{src_status}'")
                         updates.append({
                             "id": row["id"],
                             "cells": [{"columnId": cols["status"], "value": src_status}]
                         })
-                        all_changes.append([name, row["id"], tank, city, state, dest_status, src_status])
+                        try:
+                            if csv_writer is None:
+                                csv_file = open(CSV_LOG_PATH, "w", newline="", encoding="utf-8")
+                                csv_writer = csv.writer(csv_file)
+                                csv_writer.writerow(csv_header)
+                            csv_writer.writerow([name, row["id"], tank, city, state, dest_status, src_status])
+                            total_changes += 1
+                        except Exception as e:
+                            logging.error(f"⚠️  Failed to write CSV log: {e}")
 
                 if updates:
                     count = bulk_update(sid, updates)
@@ -200,16 +283,9 @@ def main(mytimer: func.TimerRequest) -> None:
             except Exception as ex:
                 logging.error(f"❌ {name}: {ex}")
 
-        # 3️⃣ Optional CSV audit
-        if all_changes:
-            try:
-                with open(CSV_LOG_PATH, "w", newline="", encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(csv_header)
-                    writer.writerows(all_changes)
-                logging.info(f"🗂️  Logged {len(all_changes)} changes to {CSV_LOG_PATH}")
-            except Exception as e:
-                logging.error(f"⚠️  Failed to write CSV log: {e}")
+        # 3️⃣ Optional CSV audit (already streamed above)
+        if total_changes:
+            logging.info(f"🗂️  Logged {total_changes} changes to {CSV_LOG_PATH}")
 
         # 4️⃣ Summary
         logging.info("───────────────────────────────────────────────")
@@ -218,3 +294,6 @@ def main(mytimer: func.TimerRequest) -> None:
 
     except Exception as e:
         logging.exception(f"❌ Fatal error in Status Sync: {e}")
+    finally:
+        if csv_file is not None:
+            csv_file.close()